@@ -0,0 +1,16 @@
+"""
+Shared entry point for the example scripts.
+"""
+
+import asyncio
+
+
+async def _eager(coro):
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    return await coro
+
+
+def run(coro):
+    """Run coro with asyncio.run, using eager tasks on Python 3.12+"""
+    return asyncio.run(_eager(coro))
@@ -11,8 +11,12 @@ This example demonstrates the full capabilities of the enhanced MiniAgent framew
 """
 
 import asyncio
+import heapq
 import os
 import json
+import re
+from collections import defaultdict
+from itertools import islice
 from pathlib import Path
 import logging
 
@@ -29,27 +33,46 @@ from miniagent.eval.harness import (
 from miniagent.tools.registry import tools
 from miniagent.exec.sandbox import get_sandbox_stats, cleanup_sandbox
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+from _eager import run as run_eager
+
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrently running agents; each one issues LLM calls
+MAX_CONCURRENT_AGENTS = 4
+_agent_slots = None  # created lazily so it binds to the running event loop
+
+async def _bounded(coro):
+    """Await a coroutine while holding one of the shared agent slots"""
+    global _agent_slots
+    if _agent_slots is None:
+        _agent_slots = asyncio.Semaphore(MAX_CONCURRENT_AGENTS)
+    async with _agent_slots:
+        return await coro
+
+def _bounded_agent(goal, max_steps):
+    """run_agent wrapper for the evaluator that shares the concurrency bound"""
+    return _bounded(run_agent(goal, max_steps=max_steps))
+
+BASIC_GOALS = (
+    "Calculate the area of a circle with radius 5",
+    "Create a file called 'demo.txt' with a hello message",
+    "Explain what machine learning is in simple terms",
+)
+
 async def demo_basic_agent():
     """Demonstrate basic agent capabilities"""
     print("\n" + "="*60)
     print("DEMO 1: Basic Agent Capabilities")
     print("="*60)
     
-    goals = [
-        "Calculate the area of a circle with radius 5",
-        "Create a file called 'demo.txt' with a hello message",
-        "Explain what machine learning is in simple terms"
-    ]
+    async def run_goal(goal):
+        return goal, await _bounded(run_agent(goal, max_steps=5))
     
-    for goal in goals:
+    # Goals are independent: run them concurrently and report each as soon as it finishes
+    for next_done in asyncio.as_completed([run_goal(goal) for goal in BASIC_GOALS]):
+        goal, result = await next_done
         print(f"\nGOAL: {goal}")
         print("-" * 40)
-        
-        result = await run_agent(goal, max_steps=5)
         print(f"RESULT: {result.get('result', 'No result')}")
         
         if 'memory_summary' in result:
@@ -71,15 +94,15 @@ async def demo_complex_task():
     print(f"GOAL: {goal}")
     print("-" * 40)
     
-    result = await run_agent(goal, max_steps=12)
+    result = await _bounded(run_agent(goal, max_steps=12))
     print(f"RESULT: {result.get('result', 'No result')}")
     
     # Show execution history
     if 'history' in result:
         print(f"\nEXECUTION STEPS: {len(result['history'])}")
-        for i, step in enumerate(result['history'][:10]):  # Show first 10 steps
-            if 'action' in step:
-                action = step['action']
+        for i, step in enumerate(islice(result['history'], 10)):  # Show first 10 steps
+            action = step.get('action')
+            if action:
                 print(f"  Step {i}: {action.get('type', 'unknown')} - {action.get('name', '')}")
 
 async def demo_evaluation():
@@ -93,7 +116,7 @@ async def demo_evaluation():
     # Run basic evaluation suite
     print("Running basic evaluation suite...")
     basic_suite = create_basic_eval_suite()
-    basic_results = await evaluator.run_suite(basic_suite, run_agent)
+    basic_results = await evaluator.run_suite(basic_suite, _bounded_agent, concurrency=len(basic_suite.tasks))
     
     print(f"\nBasic Evaluation Results:")
     print(f"  Success Rate: {basic_results['success_rate']:.1%}")
@@ -105,6 +128,10 @@ async def demo_evaluation():
         status = "✓" if task_result['success'] else "✗"
         print(f"  {status} {task_result['task_id']}: {task_result['execution_time']:.1f}s")
 
+# Success patterns for the custom evaluation tasks, each checked in a single scan
+_FILE_CREATED_RE = re.compile(r"\b(?:created|written)\b", re.IGNORECASE)
+_CALC_RESULT_RE = re.compile(r"\b(?:42(?:\.0)?|forty-two)\b", re.IGNORECASE)
+
 async def demo_custom_evaluation():
     """Demonstrate custom evaluation tasks"""
     print("\n" + "="*60)
@@ -119,12 +146,11 @@ async def demo_custom_evaluation():
     
     def check_file_creation(result):
         """Check if agent successfully created a file"""
-        return "created" in str(result).lower() or "written" in str(result).lower()
+        return _FILE_CREATED_RE.search(str(result)) is not None
     
     def check_calculation(result):
         """Check if agent performed calculation correctly"""
-        result_str = str(result).lower()
-        return any(num in result_str for num in ["42", "42.0", "forty-two"])
+        return _CALC_RESULT_RE.search(str(result)) is not None
     
     custom_suite.add_task(EvalTask(
         id="file_task",
@@ -143,7 +169,7 @@ async def demo_custom_evaluation():
     ))
     
     evaluator = AgentEvaluator()
-    results = await evaluator.run_suite(custom_suite, run_agent)
+    results = await evaluator.run_suite(custom_suite, _bounded_agent, concurrency=len(custom_suite.tasks))
     
     print(f"Custom Evaluation Results:")
     print(f"  Success Rate: {results['success_rate']:.1%}")
@@ -175,6 +201,9 @@ def demo_configuration():
     print(f"  Max Memory: {custom_config.sandbox.max_memory_mb}MB")
     print(f"  Max Output Length: {custom_config.safety.max_output_length}")
 
+# Maximum number of tool names listed per category in demo_tools
+MAX_TOOLS_SHOWN = 50
+
 def demo_tools():
     """Demonstrate available tools"""
     print("\n" + "="*60)
@@ -184,18 +213,23 @@ def demo_tools():
     tool_list = tools.list()
     print(f"Total Available Tools: {len(tool_list)}")
     
-    # Group tools by category
-    categories = {}
+    # Group tools by category in a single pass
+    categories = defaultdict(list)
     for tool in tool_list:
-        category = tool.name.split('.')[0] if '.' in tool.name else 'other'
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(tool.name)
+        head, sep, _ = tool.name.partition('.')
+        categories[head if sep else 'other'].append(tool.name)
     
     for category, tool_names in categories.items():
         print(f"\n{category.title()} Tools ({len(tool_names)}):")
-        for tool_name in sorted(tool_names):
+        # Only the first MAX_TOOLS_SHOWN names are printed, so avoid a full sort
+        if len(tool_names) > MAX_TOOLS_SHOWN:
+            preview = heapq.nsmallest(MAX_TOOLS_SHOWN, tool_names)
+        else:
+            preview = sorted(tool_names)
+        for tool_name in preview:
             print(f"  - {tool_name}")
+        if len(tool_names) > MAX_TOOLS_SHOWN:
+            print(f"  ... and {len(tool_names) - MAX_TOOLS_SHOWN} more")
 
 def demo_sandbox_stats():
     """Demonstrate sandbox statistics"""
@@ -215,6 +249,10 @@ def demo_sandbox_stats():
 
 async def main():
     """Run all demonstrations"""
+    # Keep the agent's per-step INFO logging quiet unless explicitly requested
+    verbose = bool(os.getenv("MINIAGENT_DEMO_VERBOSE"))
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING)
+    
     print("MiniAgent Comprehensive Demo")
     print("This demo showcases the full capabilities of the enhanced MiniAgent framework.")
     
@@ -225,11 +263,13 @@ async def main():
         print("Set the environment variable to see full functionality.\n")
     
     try:
-        # Run all demonstrations
-        await demo_basic_agent()
-        await demo_complex_task()
-        await demo_evaluation()
-        await demo_custom_evaluation()
+        # Run the agent demonstrations concurrently - they are I/O-bound on LLM calls
+        await asyncio.gather(
+            demo_basic_agent(),
+            demo_complex_task(),
+            demo_evaluation(),
+            demo_custom_evaluation(),
+        )
         
         demo_configuration()
         demo_tools()
@@ -251,4 +291,4 @@ async def main():
         print("\nCleaned up sandbox resources.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_eager(main())
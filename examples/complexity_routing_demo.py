@@ -6,15 +6,32 @@ This example shows how the system automatically chooses between
 deepseek-chat and deepseek-reasoner based on question complexity.
 """
 
-import asyncio
 import sys
-from pathlib import Path
 
-# Add the src directory to the path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+try:
+    import miniagent  # noqa: F401
+except ImportError:
+    # Not installed - fall back to the in-repo src directory
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from miniagent.core.runtime import run_agent
 
+from _eager import run as run_eager
+
+# Simple questions that should use deepseek-chat
+SIMPLE_QUESTIONS = (
+    "What's the current time?",
+    "Calculate 25 * 4",
+    "What is the weather like?",
+)
+
+# Complex questions that should use deepseek-reasoner
+COMPLEX_QUESTIONS = (
+    "Design a scalable microservices architecture for handling 1 million concurrent users with optimal performance and fault tolerance",
+    "Analyze the philosophical and ethical implications of artificial general intelligence on society and human decision-making autonomy",
+)
+
 async def demo_complexity_routing():
     """Demonstrate complexity routing with different types of questions."""
     
@@ -24,23 +41,10 @@ async def demo_complexity_routing():
     print("Look for 'Model selection:' messages in the logs.")
     print()
     
-    # Simple questions that should use deepseek-chat
-    simple_questions = [
-        "What's the current time?",
-        "Calculate 25 * 4",
-        "What is the weather like?"
-    ]
-    
-    # Complex questions that should use deepseek-reasoner
-    complex_questions = [
-        "Design a scalable microservices architecture for handling 1 million concurrent users with optimal performance and fault tolerance",
-        "Analyze the philosophical and ethical implications of artificial general intelligence on society and human decision-making autonomy"
-    ]
-    
     print("📝 Testing Simple Questions (should use deepseek-chat):")
     print("-" * 50)
     
-    for i, question in enumerate(simple_questions, 1):
+    for i, question in enumerate(SIMPLE_QUESTIONS, 1):
         print(f"\n{i}. Simple Question: {question}")
         try:
             result = await run_agent(question, max_steps=2, quiet_mode=True)
@@ -51,7 +55,7 @@ async def demo_complexity_routing():
     print(f"\n\n🧠 Testing Complex Questions (should use deepseek-reasoner):")
     print("-" * 50)
     
-    for i, question in enumerate(complex_questions, 1):
+    for i, question in enumerate(COMPLEX_QUESTIONS, 1):
         print(f"\n{i}. Complex Question: {question[:60]}...")
         try:
             result = await run_agent(question, max_steps=3, quiet_mode=True)
@@ -68,7 +72,7 @@ async def demo_complexity_routing():
 def main():
     """Run the demo."""
     try:
-        asyncio.run(demo_complexity_routing())
+        run_eager(demo_complexity_routing())
     except KeyboardInterrupt:
         print("\n\nDemo interrupted by user.")
     except Exception as e:
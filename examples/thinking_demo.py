@@ -10,21 +10,26 @@ import asyncio
 import os
 from miniagent.core.runtime import run_agent
 
+from _eager import run as run_eager
+
+# Seconds to pause between demos; set MINIAGENT_DEMO_PAUSE=0 for automated runs
+PAUSE = float(os.getenv("MINIAGENT_DEMO_PAUSE", "2"))
+
+# Test tasks that showcase different types of thinking
+TEST_TASKS = (
+    "Calculate the area of a circle with radius 7",
+    "Think about the steps to make a sandwich, then list them",
+    "What is 15 + 27 and explain your reasoning",
+    "Create a simple poem about AI",
+)
+
 async def demo_thinking():
     """Demonstrate the thinking process with various task types"""
     
     print("🚀 MiniAgent Thinking Process Demo")
     print("=" * 50)
     
-    # Test tasks that showcase different types of thinking
-    test_tasks = [
-        "Calculate the area of a circle with radius 7",
-        "Think about the steps to make a sandwich, then list them",
-        "What is 15 + 27 and explain your reasoning",
-        "Create a simple poem about AI",
-    ]
-    
-    for i, task in enumerate(test_tasks, 1):
+    for i, task in enumerate(TEST_TASKS, 1):
         print(f"\n📝 Demo {i}: {task}")
         print("─" * 50)
         
@@ -32,8 +37,9 @@ async def demo_thinking():
             result = await run_agent(task, max_steps=5, show_thinking=True)
             
             # Small pause between demos
-            print("\n⏳ (pausing 2 seconds before next demo...)")
-            await asyncio.sleep(2)
+            if PAUSE:
+                print(f"\n⏳ (pausing {PAUSE:g} seconds before next demo...)")
+                await asyncio.sleep(PAUSE)
             
         except Exception as e:
             print(f"❌ Demo failed: {e}")
@@ -51,4 +57,4 @@ if __name__ == "__main__":
         print("Example: export OPENAI_API_KEY=your-key-here")
         exit(1)
     
-    asyncio.run(demo_thinking())
+    run_eager(demo_thinking())
@@ -20,14 +20,36 @@ Example usage:
     asyncio.run(main())
 """
 
-from .core.runtime import run_agent
-from .core.state import AgentState
-from .config import AgentConfig, get_config, set_config
+import importlib
+
+# Imported eagerly: the registry is lightweight, and a lazy `tools` would be
+# shadowed by the `miniagent.tools` subpackage once any of its modules loads.
 from .tools.registry import tools, ToolSpec
-from .memory.store import IntegratedMemorySystem, VectorMemoryStore, EpisodicMemory, WorkingMemory
-from .eval.harness import AgentEvaluator, EvalSuite, EvalTask, create_basic_eval_suite, create_advanced_eval_suite
-from .guard.schema import validate_action, sanitize_output
-from .guard.consent import ConsentManager, get_consent_manager, set_consent_manager
+
+# Public API, imported lazily on first attribute access (PEP 562) so that
+# `import miniagent` does not pull in the LLM client, vector store and
+# embedding model until they are actually used.
+_LAZY_ATTRS = {
+    "run_agent": ".core.runtime",
+    "AgentState": ".core.state",
+    "AgentConfig": ".config",
+    "get_config": ".config",
+    "set_config": ".config",
+    "IntegratedMemorySystem": ".memory.store",
+    "VectorMemoryStore": ".memory.store",
+    "EpisodicMemory": ".memory.store",
+    "WorkingMemory": ".memory.store",
+    "AgentEvaluator": ".eval.harness",
+    "EvalSuite": ".eval.harness",
+    "EvalTask": ".eval.harness",
+    "create_basic_eval_suite": ".eval.harness",
+    "create_advanced_eval_suite": ".eval.harness",
+    "validate_action": ".guard.schema",
+    "sanitize_output": ".guard.schema",
+    "ConsentManager": ".guard.consent",
+    "get_consent_manager": ".guard.consent",
+    "set_consent_manager": ".guard.consent",
+}
 
 __version__ = "1.0.0"
 
@@ -67,4 +89,17 @@ __all__ = [
     
     # Version
     "__version__",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
@@ -0,0 +1,41 @@
+"""
+JSON helpers used for config files, CLI output and saved results.
+
+Uses orjson (a C serializer) when it is installed and the standard library
+otherwise. The output is not byte-identical: orjson writes compact separators
+and NaN/infinity as null. Objects orjson cannot encode, such as integers wider
+than 64 bits, are serialized by the standard library instead.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "speedups" extra
+    orjson = None
+
+
+def dumps_bytes(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, indented by 2 spaces if requested"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, indent=2 if indent else None, default=default, ensure_ascii=False).encode()
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize obj to a JSON string, indented by 2 spaces if requested"""
+    return dumps_bytes(obj, indent=indent, default=default).decode()
+
+
+def loads(data) -> Any:
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
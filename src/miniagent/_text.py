@@ -0,0 +1,51 @@
+"""
+Text helpers for bounded previews of tool arguments and results.
+
+Tool observations can be large (whole files, shell output). Previews shown to
+the user, stored in memory or given to the planner only need their first few
+hundred characters, so these helpers build that prefix without converting the
+whole value first.
+"""
+
+from typing import Any
+
+
+def truncated_str(value: Any, limit: int) -> str:
+    """Equivalent of str(value)[:limit] that stops converting once limit is reached"""
+    if isinstance(value, str):
+        return value[:limit]
+    return _bounded_repr(value, limit)[:limit]
+
+
+def preview(value: Any, width: int) -> str:
+    """str(value) cut to width characters, ending in "..." if it was longer"""
+    text = truncated_str(value, width + 1)
+    if len(text) > width:
+        return text[:width - 3] + "..."
+    return text
+
+
+def _bounded_repr(value: Any, limit: int) -> str:
+    """repr(value), possibly cut short once it is at least limit characters long"""
+    if isinstance(value, (str, bytes, bytearray)):
+        return repr(value[:limit])
+    if isinstance(value, dict):
+        opening, closing = "{", "}"
+        items = ((f"{_bounded_repr(k, limit)}: ", v) for k, v in value.items())
+    elif isinstance(value, list):
+        opening, closing = "[", "]"
+        items = (("", v) for v in value)
+    else:
+        return repr(value)
+
+    parts = [opening]
+    size = len(opening)
+    for i, (prefix, item) in enumerate(items):
+        if size >= limit:
+            break
+        piece = (", " if i else "") + prefix + _bounded_repr(item, limit - size)
+        parts.append(piece)
+        size += len(piece)
+    else:
+        parts.append(closing)
+    return "".join(parts)
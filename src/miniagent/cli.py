@@ -1,32 +1,217 @@
-import asyncio
 import argparse
+import os
 import sys
-import json
-from pathlib import Path
-from .core.runtime import run_agent
-from .config import get_config, create_default_config, AgentConfig
-from .eval.harness import AgentEvaluator, create_basic_eval_suite, create_advanced_eval_suite
 import logging
 
+# Heavy modules (runtime, memory store, evaluation harness) are imported inside
+# the commands that need them, so `--help`, `tools` and `config` start quickly.
+
 logger = logging.getLogger(__name__)
 
+TOOLS_CACHE_PATH = os.path.expanduser("~/.miniagent/tools.cache.json")
+
+# Modules whose source defines the tool listing; their mtimes key the cache
+_TOOL_MODULES = ("miniagent.tools.registry", "miniagent.tools.builtin")
+
+def _trunc(text, limit):
+    """Shorten text to at most limit characters, marking the cut with '...'"""
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def _indent_lines(text, buf, prefix="   "):
+    """Append the non-blank lines of text to buf, stripped and indented"""
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            buf.append(prefix + line)
+
+def _classify_entry(entry):
+    """Tag a history entry with the formatter that renders it (None = not shown)"""
+    if 'action' in entry:
+        return _ACTION_TAGS.get(entry['action'].get('type'), 'action')
+    if 'thought' in entry:
+        return 'thought'
+    if 'observations' in entry:
+        return 'obs_batch'
+    if 'observation' in entry:
+        return 'obs_dict' if isinstance(entry['observation'], dict) else 'obs_scalar'
+    if 'error' in entry:
+        return 'error'
+    return None
+
+def _format_think(entry, step, buf):
+    buf.append(f"\n💭 Step {step}: THINKING")
+    _indent_lines(entry['action'].get('reasoning', 'Processing...'), buf)
+
+def _format_tool(entry, step, buf):
+    action = entry['action']
+    buf.append(f"\n🔧 Step {step}: USING TOOL")
+    buf.append(f"   Tool: {action.get('name', 'unknown')}")
+    buf.append(f"   Args: {_trunc(str(action.get('args', {})), 80)}")
+
+def _format_batch(entry, step, buf):
+    calls = entry['action'].get('calls') or []
+    buf.append(f"\n🔧 Step {step}: USING {len(calls)} TOOLS IN PARALLEL")
+    for call in calls:
+        buf.append(f"   Tool: {call.get('name', 'unknown')}")
+        buf.append(f"     Args: {_trunc(str(call.get('args', {})), 78)}")
+
+def _format_finish(entry, step, buf):
+    buf.append(f"\n✅ Step {step}: COMPLETING TASK")
+    buf.append("   Final answer ready")
+
+def _format_thought(entry, step, buf):
+    buf.append("\n💭 REFLECTION:")
+    _indent_lines(entry['thought'], buf)
+
+# Observation keys the renderer looks for, probed with one set intersection
+_OBS_KEYS = frozenset({'error', 'success', 'results', 'summary', 'guidance', 'message',
+                       'result', 'output', 'content', 'answer'})
+_RESULT_KEYS = ('result', 'output', 'content', 'answer')
+
+def _format_obs_dict(entry, step, buf):
+    obs = entry['observation']
+    present = obs.keys() & _OBS_KEYS
+    if 'error' in present:
+        buf.append(f"   📋 Result: ❌ {obs['error']}")
+        return
+    if 'success' in present:
+        buf.append(f"   📋 Result: ✅ {obs.get('success', 'Success')}")
+        return
+    
+    # Show key results - handle different result types
+    key_results = []
+    
+    # Handle web search results (enhanced display)
+    if 'results' in present and 'summary' in present:
+        count = obs.get('count', 0)
+        summary = obs.get('summary', 'No summary')[:120]
+        key_results.append(f"Found {count} results: {summary}")
+        
+        if count > 0:
+            # Show top results with sources
+            for i, search_result in enumerate(obs.get('results', [])[:2]):
+                title = search_result.get('title', 'No title')[:60]
+                source = search_result.get('source', 'Web')
+                key_results.append(f"{i+1}. {title} ({source})")
+    
+    # Handle stock/weather info tool results
+    elif 'guidance' in present and 'message' in present:
+        message = obs.get('message', '')[:60]
+        suggestion = obs.get('suggestion', '')[:80]
+        key_results.append(f"{message}")
+        if suggestion:
+            key_results.append(f"Suggestion: {suggestion}")
+    
+    # Handle other standard result types
+    if not key_results:
+        for key in _RESULT_KEYS:
+            if key in present:
+                key_results.append(f"{key}: {_trunc(str(obs[key]), 60)}")
+    
+    if not key_results:
+        # Fallback for complex dictionaries
+        keys = list(obs.keys())[:3]
+        key_results.append(f"Data available: {', '.join(keys)}")
+    
+    buf.append(f"   📋 Result: {' | '.join(key_results)}")
+
+def _format_obs_scalar(entry, step, buf):
+    buf.append(f"   📋 Result: {_trunc(str(entry['observation']), 80)}")
+
+def _format_obs_batch(entry, step, buf):
+    for observation in entry['observations']:
+        single = {'observation': observation}
+        if isinstance(observation, dict):
+            _format_obs_dict(single, step, buf)
+        else:
+            _format_obs_scalar(single, step, buf)
+
+def _format_error(entry, step, buf):
+    buf.append(f"   ❌ Error: {entry['error']}")
+
+def _format_nothing(entry, step, buf):
+    pass
+
+# Action type -> entry tag; other action types still count as a step
+_ACTION_TAGS = {'think': 'action_think', 'tool': 'action_tool', 'tool_batch': 'action_batch',
+                'finish': 'action_finish'}
+
+_HISTORY_FORMATTERS = {
+    'action': _format_nothing,
+    'action_think': _format_think,
+    'action_tool': _format_tool,
+    'action_batch': _format_batch,
+    'action_finish': _format_finish,
+    'thought': _format_thought,
+    'obs_dict': _format_obs_dict,
+    'obs_scalar': _format_obs_scalar,
+    'obs_batch': _format_obs_batch,
+    'error': _format_error,
+}
+
+def _render_history(history):
+    """Render the agent's thought process as one string, ready for a single write"""
+    buf = ["\n🧠 AGENT THOUGHT PROCESS:", "-" * 40]
+    
+    step_count = 0
+    for entry in history:
+        tag = _classify_entry(entry)
+        if tag is None:
+            continue
+        if tag.startswith('action'):
+            step_count += 1
+        _HISTORY_FORMATTERS[tag](entry, step_count, buf)
+    
+    buf.append("\n" + "-" * 40)
+    buf.append("")  # trailing newline
+    return "\n".join(buf)
+
+def _write_json(obj):
+    """Write obj to stdout as JSON, indented only when stdout is a terminal"""
+    from . import _json
+    
+    data = _json.dumps_bytes(obj, indent=sys.stdout.isatty(), default=str) + b"\n"
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        sys.stdout.write(data.decode())
+        return
+    sys.stdout.flush()  # keep ordering with anything already printed
+    buffer.write(data)
+    buffer.flush()
+
+# Loggers that drown out the agent's own output unless --verbose is given
+_NOISY_LOGGERS = (
+    'sentence_transformers',
+    'miniagent.policy.planner_llm',
+    'miniagent.policy.complexity_analyzer',
+    'miniagent.policy.model_selector',
+    'httpx',
+    'miniagent.core.runtime',
+)
+
+def _quiet_noisy_loggers():
+    """Raise the noisy loggers to WARNING and silence tokenizer warnings"""
+    for name in _NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+
+def _run_async(coro):
+    """Run coro to completion, on a uvloop event loop when uvloop is installed"""
+    import asyncio
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    if sys.version_info >= (3, 12):
+        return asyncio.run(coro, loop_factory=uvloop.new_event_loop)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(coro)
+
 def cmd_run(args):
     """Run the agent with a goal"""
-    config = get_config()
+    from .config import get_config
     
-    # Set cleaner logging for better user experience
-    import logging
-    if not getattr(args, 'verbose', False):
-        # Suppress verbose logs for clean output
-        logging.getLogger('sentence_transformers').setLevel(logging.WARNING)
-        logging.getLogger('miniagent.policy.planner_llm').setLevel(logging.WARNING)
-        logging.getLogger('miniagent.policy.complexity_analyzer').setLevel(logging.WARNING)
-        logging.getLogger('miniagent.policy.model_selector').setLevel(logging.WARNING)
-        logging.getLogger('httpx').setLevel(logging.WARNING)
-        logging.getLogger('miniagent.core.runtime').setLevel(logging.WARNING)
-        # Suppress tokenizer warnings
-        import os
-        os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    config = get_config()
     
     if not config.llm.get_active_api_key():
         provider = config.llm.provider
@@ -41,6 +226,9 @@ def cmd_run(args):
         # Enable real-time thinking if verbose or if thinking flag is set
         show_thinking = args.verbose or getattr(args, 'thinking', False)
         quiet_mode = getattr(args, 'quiet', False)
+        if not (quiet_mode or args.json or show_thinking) and not sys.stdout.isatty():
+            # Piped output: skip the step-by-step display, like `--quiet`
+            quiet_mode = True
         
         # Determine consent mode
         interactive_consent = None
@@ -50,7 +238,14 @@ def cmd_run(args):
             interactive_consent = False
         # If neither flag is set, use config default (handled in run_agent)
         
-        result = asyncio.run(run_agent(
+        # Set cleaner logging for better user experience, before importing
+        # the runtime and the libraries it pulls in
+        if not getattr(args, 'verbose', False):
+            _quiet_noisy_loggers()
+        
+        from .core.runtime import run_agent
+        
+        result = _run_async(run_agent(
             args.goal, 
             max_steps=args.steps, 
             show_thinking=show_thinking, 
@@ -59,7 +254,7 @@ def cmd_run(args):
         ))
         
         if args.json:
-            print(json.dumps(result, indent=2, default=str))
+            _write_json(result)
         else:
             # If we already showed thinking in real-time, just show a summary
             if show_thinking:
@@ -72,112 +267,8 @@ def cmd_run(args):
                 print("=" * 60)
             
             # Show thought process and execution steps (only if not already shown)
-            if 'history' in result and not show_thinking:
-                print("\n🧠 AGENT THOUGHT PROCESS:")
-                print("-" * 40)
-                
-                step_count = 0
-                for entry in result['history']:
-                    if 'action' in entry:
-                        action = entry['action']
-                        step_count += 1
-                        
-                        if action.get('type') == 'think':
-                            print(f"\n💭 Step {step_count}: THINKING")
-                            reasoning = action.get('reasoning', 'Processing...')
-                            # Format reasoning nicely
-                            lines = reasoning.split('\n')
-                            for line in lines:
-                                if line.strip():
-                                    print(f"   {line.strip()}")
-                        
-                        elif action.get('type') == 'tool':
-                            print(f"\n🔧 Step {step_count}: USING TOOL")
-                            print(f"   Tool: {action.get('name', 'unknown')}")
-                            args_str = str(action.get('args', {}))
-                            if len(args_str) > 80:
-                                args_str = args_str[:77] + "..."
-                            print(f"   Args: {args_str}")
-                        
-                        elif action.get('type') == 'finish':
-                            print(f"\n✅ Step {step_count}: COMPLETING TASK")
-                            print(f"   Final answer ready")
-                    
-                    elif 'thought' in entry:
-                        print(f"\n💭 REFLECTION:")
-                        thought = entry['thought']
-                        lines = thought.split('\n')
-                        for line in lines:
-                            if line.strip():
-                                print(f"   {line.strip()}")
-                    
-                    elif 'observation' in entry:
-                        obs = entry['observation']
-                        print(f"   📋 Result: ", end="")
-                        
-                        # Format observation nicely
-                        if isinstance(obs, dict):
-                            if 'error' in obs:
-                                print(f"❌ {obs['error']}")
-                            elif 'success' in obs:
-                                print(f"✅ {obs.get('success', 'Success')}")
-                            else:
-                                # Show key results - handle different result types
-                                key_results = []
-                                
-                                # Handle web search results (enhanced display)
-                                if 'results' in obs and 'summary' in obs:
-                                    count = obs.get('count', 0)
-                                    summary = obs.get('summary', 'No summary')[:120]
-                                    key_results.append(f"Found {count} results: {summary}")
-                                    
-                                    if count > 0:
-                                        # Show top results with sources
-                                        top_results = obs.get('results', [])[:2]
-                                        for i, result in enumerate(top_results):
-                                            title = result.get('title', 'No title')[:60]
-                                            source = result.get('source', 'Web')
-                                            key_results.append(f"{i+1}. {title} ({source})")
-                                
-                                # Handle stock/weather info tool results
-                                elif 'guidance' in obs and 'message' in obs:
-                                    message = obs.get('message', '')[:60]
-                                    suggestion = obs.get('suggestion', '')[:80]
-                                    key_results.append(f"{message}")
-                                    if suggestion:
-                                        key_results.append(f"Suggestion: {suggestion}")
-                                
-                                # Handle other standard result types
-                                if not key_results:
-                                    for key in ['result', 'output', 'content', 'answer']:
-                                        if key in obs:
-                                            val = str(obs[key])
-                                            if len(val) > 60:
-                                                val = val[:57] + "..."
-                                            key_results.append(f"{key}: {val}")
-                                
-                                # Check if it's a boolean success indicator that needs better display
-                                if not key_results and isinstance(obs, bool) and obs:
-                                    key_results.append("Operation completed successfully")
-                                elif not key_results and isinstance(obs, dict):
-                                    # Fallback for complex dictionaries
-                                    keys = list(obs.keys())[:3]
-                                    key_results.append(f"Data available: {', '.join(keys)}")
-                                
-                                if key_results:
-                                    print(" | ".join(key_results))
-                                else:
-                                    print("Operation completed")
-                        else:
-                            obs_str = str(obs)
-                            if len(obs_str) > 80:
-                                obs_str = obs_str[:77] + "..."
-                            print(obs_str)
-                    
-                    elif 'error' in entry:
-                        print(f"   ❌ Error: {entry['error']}")
-                
-                print("\n" + "-" * 40)
+            if 'history' in result and not (show_thinking or quiet_mode):
+                sys.stdout.write(_render_history(result['history']))
             
             # Show final result (only if runtime didn't already show it)
             # The runtime shows final result when agent finishes successfully
@@ -223,6 +314,10 @@ def cmd_run(args):
 
 def cmd_eval(args):
     """Run evaluation suites"""
+    from .config import get_config
+    from .core.runtime import run_agent
+    from .eval.harness import AgentEvaluator, create_basic_eval_suite, create_advanced_eval_suite
+    
     config = get_config()
     
     if not config.llm.get_active_api_key():
@@ -230,7 +325,7 @@ def cmd_eval(args):
         print(f"Error: {provider.title()} API key not configured.")
         return 1
     
-    evaluator = AgentEvaluator()
+    evaluator = AgentEvaluator(concurrency=args.concurrency)
     
     try:
         if args.suite == "basic":
@@ -242,10 +337,10 @@ def cmd_eval(args):
             return 1
         
         print(f"Running evaluation suite: {suite.name}")
-        result = asyncio.run(evaluator.run_suite(suite, run_agent))
+        result = _run_async(evaluator.run_suite(suite, run_agent))
         
         if args.json:
-            print(json.dumps(result, indent=2, default=str))
+            _write_json(result)
         else:
             print(f"\nEvaluation Results for {result['suite_name']}:")
             print(f"Success Rate: {result['success_rate']:.2%}")
@@ -270,6 +365,9 @@ def cmd_eval(args):
 
 def cmd_config(args):
     """Manage configuration"""
+    from . import _json
+    from .config import get_config, create_default_config
+    
     if args.action == "create":
         create_default_config(args.output)
         return 0
@@ -283,18 +381,7 @@ def cmd_config(args):
         print(f"API Key Set: {'✓' if active_config.api_key else '✗'}")
         print()
         
-        config_dict = {
-            'llm': {
-                'provider': config.llm.provider,
-                'openai': config.llm.openai.__dict__,
-                'deepseek': config.llm.deepseek.__dict__
-            },
-            'sandbox': config.sandbox.__dict__,
-            'memory': config.memory.__dict__,
-            'safety': config.safety.__dict__,
-            'runtime': config.runtime.__dict__
-        }
-        print(json.dumps(config_dict, indent=2))
+        print(_json.dumps(config.as_dict(), indent=True))
         return 0
     else:
         print(f"Unknown config action: {args.action}")
@@ -307,6 +394,8 @@ def cmd_provider(args):
         print("Supported providers: deepseek, openai")
         return 1
     
+    from .config import get_config
+    
     config = get_config()
     config.llm.provider = args.provider_name
     
@@ -327,94 +416,199 @@ def cmd_provider(args):
     
     return 0
 
-def cmd_tools(args):
-    """List available tools"""
+def _tools_cache_key():
+    """Digest of the tool modules' paths and mtimes, found without importing them"""
+    import hashlib
+    import importlib.util
+    
+    digest = hashlib.blake2b(digest_size=16)
+    for name in _TOOL_MODULES:
+        origin = importlib.util.find_spec(name).origin
+        digest.update(f"{origin}:{os.stat(origin).st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def _tool_listing_json():
+    """Return the tool listing as indented JSON bytes, cached across runs
+    
+    The cache file holds the key on its first line and the listing after it.
+    Importing the built-in tools pulls in httpx and friends, so a cache hit
+    skips the registry entirely.
+    """
+    from . import _json
+    
+    key = _tools_cache_key().encode()
+    try:
+        with open(TOOLS_CACHE_PATH, 'rb') as f:
+            cached_key, _, body = f.read().partition(b"\n")
+        if cached_key == key:
+            return body
+    except OSError:
+        pass
+    
     from .tools.registry import tools
+    from .tools import builtin  # noqa: F401 - registers the built-in tools
+    
+    tool_data = []
+    for tool in tools.list():
+        tool_data.append({
+            "name": tool.name,
+            "schema": tool.schema,
+            "timeout": tool.timeout_s
+        })
+    body = _json.dumps_bytes(tool_data, indent=True) + b"\n"
+    
+    try:
+        os.makedirs(os.path.dirname(TOOLS_CACHE_PATH), exist_ok=True)
+        tmp_path = TOOLS_CACHE_PATH + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(key + b"\n" + body)
+        os.replace(tmp_path, TOOLS_CACHE_PATH)
+    except OSError as e:
+        logger.debug(f"Could not write tools cache {TOOLS_CACHE_PATH}: {e}")
     
-    tool_list = tools.list()
+    return body
+
+def cmd_tools(args):
+    """List available tools"""
+    listing = _tool_listing_json()
     
     if args.json:
-        tool_data = []
-        for tool in tool_list:
-            tool_data.append({
-                "name": tool.name,
-                "schema": tool.schema,
-                "timeout": tool.timeout_s
-            })
-        print(json.dumps(tool_data, indent=2))
+        sys.stdout.write(listing.decode())
     else:
+        from . import _json
+        tool_list = _json.loads(listing)
         print(f"Available Tools ({len(tool_list)}):")
         print("=" * 50)
         for tool in tool_list:
-            print(f"  {tool.name}")
-            if 'description' in tool.schema:
-                print(f"    {tool.schema['description']}")
-            if 'properties' in tool.schema:
-                params = list(tool.schema['properties'].keys())
+            print(f"  {tool['name']}")
+            if 'description' in tool['schema']:
+                print(f"    {tool['schema']['description']}")
+            if 'properties' in tool['schema']:
+                params = list(tool['schema']['properties'].keys())
                 print(f"    Parameters: {', '.join(params)}")
             print()
     
     return 0
 
-def main():
-    parser = argparse.ArgumentParser(description="MiniAgent - A comprehensive AI agent framework")
+def _add_run_arguments(parser):
+    parser.add_argument("goal", type=str, help="Agent goal, e.g., 'research X'")
+    parser.add_argument("--steps", type=int, default=6, help="Max reasoning/tool steps")
+    parser.add_argument("--thinking", action="store_true", help="Show real-time agent thinking process")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Minimal output - only show final result")
+    parser.add_argument("--interactive", "--consent", action="store_true", help="Enable interactive consent mode for file operations")
+    parser.add_argument("--no-consent", action="store_true", help="Disable interactive consent mode (override config)")
+
+def _add_eval_arguments(parser):
+    parser.add_argument("suite", choices=["basic", "advanced"], help="Evaluation suite to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of tasks to run at once")
+
+def _add_config_arguments(parser):
+    parser.add_argument("action", choices=["create", "show"], help="Configuration action")
+    parser.add_argument("--output", type=str, default="./agent_config.json", help="Output file for create action")
+
+def _add_tools_arguments(parser):
+    pass
+
+def _add_provider_arguments(parser):
+    parser.add_argument("provider_name", choices=["deepseek", "openai"], help="LLM provider to use")
+
+# Subcommand name -> (help text, argument builder, handler)
+_COMMANDS = {
+    "run": ("Run the agent with a goal", _add_run_arguments, cmd_run),
+    "eval": ("Run evaluation suites", _add_eval_arguments, cmd_eval),
+    "config": ("Manage configuration", _add_config_arguments, cmd_config),
+    "tools": ("List available tools", _add_tools_arguments, cmd_tools),
+    "provider": ("Switch LLM provider", _add_provider_arguments, cmd_provider),
+}
+
+def _peek_command(argv):
+    """Find the subcommand in argv without building any parser"""
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+        elif arg == "--config":
+            skip_value = True  # its value is not the subcommand
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+class _FastParser(argparse.ArgumentParser):
+    """ArgumentParser that reuses one formatter across add_argument calls
+    
+    add_argument builds a throwaway HelpFormatter for every action just to
+    validate its metavar. That check keeps no state on the formatter, so one
+    instance per parser is enough. Help and usage output still get a fresh
+    formatter, since formatting them accumulates state on it.
+    """
+    _reuse_formatter = False
+    _cached_formatter = None
+    
+    def add_argument(self, *args, **kwargs):
+        self._reuse_formatter = True
+        try:
+            return super().add_argument(*args, **kwargs)
+        finally:
+            self._reuse_formatter = False
+    
+    def _get_formatter(self):
+        if not self._reuse_formatter:
+            return super()._get_formatter()
+        if self._cached_formatter is None:
+            self._cached_formatter = super()._get_formatter()
+        return self._cached_formatter
+
+def _build_parser(command=None):
+    """Build the CLI parser, with only `command`'s subparser when one is given"""
+    # Subparsers inherit the parser class, so they use _FastParser too
+    parser = _FastParser(description="MiniAgent - A comprehensive AI agent framework")
     parser.add_argument("--config", type=str, help="Path to configuration file")
     parser.add_argument("--json", action="store_true", help="Output results in JSON format")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    for name in ([command] if command else _COMMANDS):
+        help_text, add_arguments, handler = _COMMANDS[name]
+        subparser = subparsers.add_parser(name, help=help_text)
+        add_arguments(subparser)
+        subparser.set_defaults(func=handler)
+    
+    return parser
+
+def _legacy_run_args(argv):
+    """Arguments for legacy `miniagent "goal" [--steps=N]`, parsed without argparse"""
+    args = argparse.Namespace(
+        goal=argv[0], steps=6, config=None, json=False, verbose=False,
+        thinking=False, quiet=False, interactive=False, no_consent=False,
+    )
+    for arg in argv[1:]:
+        if arg.startswith('--steps='):
+            args.steps = int(arg.split('=')[1])
+    return args
+
+def main():
+    argv = sys.argv[1:]
+    
+    # Legacy usage (direct goal argument) goes straight to `run`
+    if argv and not argv[0].startswith('-') and argv[0] not in _COMMANDS:
+        return cmd_run(_legacy_run_args(argv))
+    
+    # Two phases: peek at the subcommand, then build just the parser it needs.
+    # The full parser is only built for top-level help and unknown commands.
+    command = _peek_command(argv)
+    parser = _build_parser(command if command in _COMMANDS else None)
     
-    # Run command
-    run_parser = subparsers.add_parser("run", help="Run the agent with a goal")
-    run_parser.add_argument("goal", type=str, help="Agent goal, e.g., 'research X'")
-    run_parser.add_argument("--steps", type=int, default=6, help="Max reasoning/tool steps")
-    run_parser.add_argument("--thinking", action="store_true", help="Show real-time agent thinking process")
-    run_parser.add_argument("--quiet", "-q", action="store_true", help="Minimal output - only show final result")
-    run_parser.add_argument("--interactive", "--consent", action="store_true", help="Enable interactive consent mode for file operations")
-    run_parser.add_argument("--no-consent", action="store_true", help="Disable interactive consent mode (override config)")
-    run_parser.set_defaults(func=cmd_run)
-    
-    # Eval command
-    eval_parser = subparsers.add_parser("eval", help="Run evaluation suites")
-    eval_parser.add_argument("suite", choices=["basic", "advanced"], help="Evaluation suite to run")
-    eval_parser.set_defaults(func=cmd_eval)
-    
-    # Config command
-    config_parser = subparsers.add_parser("config", help="Manage configuration")
-    config_parser.add_argument("action", choices=["create", "show"], help="Configuration action")
-    config_parser.add_argument("--output", type=str, default="./agent_config.json", help="Output file for create action")
-    config_parser.set_defaults(func=cmd_config)
-    
-    # Tools command
-    tools_parser = subparsers.add_parser("tools", help="List available tools")
-    tools_parser.set_defaults(func=cmd_tools)
-    
-    # Provider command
-    provider_parser = subparsers.add_parser("provider", help="Switch LLM provider")
-    provider_parser.add_argument("provider_name", choices=["deepseek", "openai"], help="LLM provider to use")
-    provider_parser.set_defaults(func=cmd_provider)
-    
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Load custom config if provided
     if args.config:
-        from .config import set_config
+        from .config import AgentConfig, set_config
         custom_config = AgentConfig.from_file(args.config)
         set_config(custom_config)
     
-    # Handle legacy usage (direct goal argument)
     if not hasattr(args, 'func'):
-        if len(sys.argv) > 1 and not sys.argv[1].startswith('-'):
-            # Legacy mode: miniagent "goal"
-            args.goal = sys.argv[1]
-            args.steps = 6
-            for arg in sys.argv[2:]:
-                if arg.startswith('--steps='):
-                    args.steps = int(arg.split('=')[1])
-            return cmd_run(args)
-        else:
-            parser.print_help()
-            return 0
+        parser.print_help()
+        return 0
     
     return args.func(args)
 
@@ -1,13 +1,24 @@
 import os
-import json
+import sys
+import copy
+import hashlib
+import pickle
 from pathlib import Path
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, asdict, is_dataclass
 import logging
+from . import _json
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Config sections are slotted on Python 3.10+ (no per-instance __dict__).
+# They stay mutable: callers and demos adjust settings in place.
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Set once setup_logging has installed handlers; later set_config calls reuse them
+_logging_configured = False
+
+@dataclass(**_DATACLASS_OPTIONS)
 class OpenAIConfig:
     """OpenAI API configuration"""
     api_key: str = ""
@@ -21,7 +32,7 @@ class OpenAIConfig:
         if not self.api_key:
             self.api_key = os.getenv("OPENAI_API_KEY", "")
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class DeepSeekConfig:
     """DeepSeek API configuration"""
     api_key: str = ""
@@ -44,7 +55,7 @@ class DeepSeekConfig:
             return self.reasoner_model
         return self.model
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class LLMConfig:
     """General LLM provider configuration"""
     provider: str = "deepseek"  # Default to DeepSeek
@@ -65,7 +76,7 @@ class LLMConfig:
         config = self.get_active_config()
         return config.api_key
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class SandboxConfig:
     """Sandbox execution configuration"""
     max_memory_mb: int = 512
@@ -75,7 +86,7 @@ class SandboxConfig:
     enable_network: bool = True
     temp_dir: str = "/tmp"
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class MemoryConfig:
     """Memory system configuration"""
     persist_dir: str = "./agent_memory"
@@ -84,7 +95,7 @@ class MemoryConfig:
     max_working_memory_items: int = 20
     embedding_model: str = "all-MiniLM-L6-v2"
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class SafetyConfig:
     """Safety and security configuration"""
     enable_content_filtering: bool = True
@@ -97,7 +108,7 @@ class SafetyConfig:
         "/dev/", "/proc/", "/sys/", "/root/"
     ])
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ConsentConfig:
     """User consent configuration"""
     enable_interactive_consent: bool = False
@@ -110,7 +121,7 @@ class ConsentConfig:
         "./", "./temp/", "./workspace/", "./output/", "./artifacts/"
     ])
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class RuntimeConfig:
     """Runtime execution configuration"""
     max_steps: int = 10
@@ -119,8 +130,14 @@ class RuntimeConfig:
     log_level: str = "INFO"
     enable_memory_persistence: bool = True
     enable_guardrails: bool = True
+    enable_direct_answers: bool = True  # answer plain arithmetic goals without planning
+    enable_plan_cache: bool = False  # replay tool calls of similar finished goals
+    # Tools without side effects whose results are reused for repeated calls in a run
+    cacheable_tools: list = field(default_factory=lambda: [
+        "file.read", "file.list", "web.search", "math.calc"
+    ])
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class AgentConfig:
     """Main agent configuration"""
     llm: LLMConfig = field(default_factory=LLMConfig)
@@ -139,14 +156,14 @@ class AgentConfig:
     @classmethod
     def from_file(cls, config_path: str) -> 'AgentConfig':
         """Load configuration from JSON file"""
-        config_file = Path(config_path)
-        if not config_file.exists():
+        try:
+            raw = Path(config_path).read_bytes()
+        except FileNotFoundError:
             logger.warning(f"Config file {config_path} not found, using defaults")
             return cls()
         
         try:
-            with open(config_file, 'r') as f:
-                config_data = json.load(f)
+            config_data = _json.loads(raw)
             
             # Create config objects from nested dictionaries
             llm_data = config_data.get('llm', {})
@@ -160,91 +177,160 @@ class AgentConfig:
                 }
             
             # Create LLM config
-            openai_config = OpenAIConfig(**llm_data.get('openai', {}))
-            deepseek_config = DeepSeekConfig(**llm_data.get('deepseek', {}))
             llm_config = LLMConfig(
                 provider=llm_data.get('provider', 'deepseek'),
-                openai=openai_config,
-                deepseek=deepseek_config
+                openai=OpenAIConfig(**llm_data.get('openai', {})),
+                deepseek=DeepSeekConfig(**llm_data.get('deepseek', {}))
             )
+            sections = {
+                name: section_cls(**config_data.get(name, {}))
+                for name, section_cls in _SECTION_TYPES.items()
+            }
             
-            sandbox_config = SandboxConfig(**config_data.get('sandbox', {}))
-            memory_config = MemoryConfig(**config_data.get('memory', {}))
-            safety_config = SafetyConfig(**config_data.get('safety', {}))
-            runtime_config = RuntimeConfig(**config_data.get('runtime', {}))
-            consent_config = ConsentConfig(**config_data.get('consent', {}))
-            
-            return cls(
-                llm=llm_config,
-                sandbox=sandbox_config,
-                memory=memory_config,
-                safety=safety_config,
-                runtime=runtime_config,
-                consent=consent_config
-            )
+            return cls(llm=llm_config, **sections)
             
         except Exception as e:
             logger.error(f"Failed to load config from {config_path}: {e}")
             return cls()
     
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the configuration as nested plain dicts, as written to config files"""
+        return asdict(self)
+    
     def to_file(self, config_path: str):
         """Save configuration to JSON file"""
-        config_data = {
-            'llm': {
-                'provider': self.llm.provider,
-                'openai': self.llm.openai.__dict__,
-                'deepseek': self.llm.deepseek.__dict__
-            },
-            'sandbox': self.sandbox.__dict__,
-            'memory': self.memory.__dict__,
-            'safety': self.safety.__dict__,
-            'runtime': self.runtime.__dict__,
-            'consent': self.consent.__dict__
-        }
-        
         config_file = Path(config_path)
         config_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(config_file, 'w') as f:
-            json.dump(config_data, f, indent=2)
+        config_file.write_bytes(_json.dumps_bytes(self.as_dict(), indent=True))
         
         logger.info(f"Saved configuration to {config_path}")
     
     def setup_logging(self):
-        """Setup logging based on configuration"""
-        if self.runtime.enable_logging:
+        """Setup logging based on configuration (only the first call takes effect)"""
+        global _logging_configured
+        if self.runtime.enable_logging and not _logging_configured:
             level = getattr(logging, self.runtime.log_level.upper(), logging.INFO)
             logging.basicConfig(
                 level=level,
                 format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
                 handlers=[
                     logging.StreamHandler(),
-                    logging.FileHandler('agent.log')
+                    # Opened on the first record, not when logging is set up
+                    logging.FileHandler('agent.log', delay=True)
                 ]
             )
+            _logging_configured = True
+
+
+# Top-level sections besides llm: key in the config file -> dataclass
+_SECTION_TYPES = {
+    'sandbox': SandboxConfig,
+    'memory': MemoryConfig,
+    'safety': SafetyConfig,
+    'runtime': RuntimeConfig,
+    'consent': ConsentConfig,
+}
+
+# Pickled snapshot of the last config file loaded, reused while the file is unchanged
+CONFIG_CACHE_PATH = Path(os.path.expanduser("~/.miniagent/config.cache.pkl"))
+
+# Config files load_config looks for, in order, when no path is given
+_CANDIDATE_PATHS = (
+    "./agent_config.json",
+    "./config/agent.json",
+    os.path.expanduser("~/.miniagent/config.json"),
+    "/etc/miniagent/config.json",
+)
+
+# Environment variables that provide API keys when the config file leaves them empty
+_API_KEY_ENV_VARS = {"openai": "OPENAI_API_KEY", "deepseek": "DEEPSEEK_API_KEY"}
+
+
+def _schema_fields(cls) -> list:
+    """Qualified names of cls's dataclass fields, including nested config sections"""
+    names = []
+    for f in fields(cls):
+        names.append(f"{cls.__name__}.{f.name}")
+        if is_dataclass(f.type):
+            names.extend(_schema_fields(f.type))
+    return names
+
+
+# Digest of the config dataclasses' field names, part of the cache stamp
+_SCHEMA_DIGEST = hashlib.sha256("\0".join(_schema_fields(AgentConfig)).encode()).hexdigest()
+
+
+def _config_cache_stamp(config_path: str) -> tuple:
+    """Identify a config file version and the code caching it: file stat, API key env
+    digest, package version and config schema"""
+    from . import __version__
+    st = os.stat(config_path)
+    env = "\0".join(os.getenv(var) or "" for var in _API_KEY_ENV_VARS.values())
+    env_digest = hashlib.sha256(env.encode()).hexdigest()
+    return (os.path.realpath(config_path), st.st_mtime_ns, st.st_size, env_digest,
+            __version__, _SCHEMA_DIGEST)
+
+
+def _load_cached_config(config_path: str) -> Optional[AgentConfig]:
+    """Return the cached config for config_path, or None if missing or stale"""
+    try:
+        with open(CONFIG_CACHE_PATH, 'rb') as f:
+            if pickle.load(f) != _config_cache_stamp(config_path):
+                return None
+            config = pickle.load(f)
+        # Every field must be present; a snapshot from other code is a miss
+        if not isinstance(config, AgentConfig):
+            return None
+        config.as_dict()
+        
+        # Keys that came from the environment are not stored; resolve them again
+        config.llm.openai.__post_init__()
+        config.llm.deepseek.__post_init__()
+    except Exception:
+        return None
+    return config
+
+
+def _save_cached_config(config_path: str, config: AgentConfig):
+    """Write a snapshot of config for config_path to the cache file"""
+    snapshot = copy.deepcopy(config)
+    for provider, env_var in _API_KEY_ENV_VARS.items():
+        provider_config = getattr(snapshot.llm, provider)
+        if provider_config.api_key and provider_config.api_key == os.getenv(env_var):
+            provider_config.api_key = ""
+    
+    try:
+        CONFIG_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = CONFIG_CACHE_PATH.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(_config_cache_stamp(config_path), f)
+            pickle.dump(snapshot, f)
+        os.replace(tmp_path, CONFIG_CACHE_PATH)
+    except Exception as e:
+        logger.debug(f"Could not write config cache {CONFIG_CACHE_PATH}: {e}")
 
 
 def load_config(config_path: Optional[str] = None) -> AgentConfig:
     """Load agent configuration"""
     if config_path is None:
         # Try common config locations
-        possible_paths = [
-            "./agent_config.json",
-            "./config/agent.json",
-            os.path.expanduser("~/.miniagent/config.json"),
-            "/etc/miniagent/config.json"
-        ]
-        
-        for path in possible_paths:
-            if Path(path).exists():
+        for path in _CANDIDATE_PATHS:
+            if os.path.isfile(path):
                 config_path = path
                 break
+    elif not os.path.isfile(config_path):
+        config_path = None
     
-    if config_path and Path(config_path).exists():
-        return AgentConfig.from_file(config_path)
-    else:
+    if config_path is None:
         logger.info("No config file found, using default configuration")
         return AgentConfig()
+    
+    config = _load_cached_config(config_path)
+    if config is None:
+        config = AgentConfig.from_file(config_path)
+        _save_cached_config(config_path, config)
+    return config
 
 
 def create_default_config(output_path: str = "./agent_config.json"):
@@ -1,17 +1,60 @@
+import re
+import sys
+import json
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Mapping, Callable, Awaitable
 from .state import AgentState
 from ..policy.planner import plan_next
-from ..tools.registry import tools
+from ..tools.registry import tools, ToolSpec
 from ..tools import builtin  # Import to register built-in tools
-from ..exec.sandbox import run_tool
+from ..exec.sandbox import run_tool, set_sandbox, SandboxExecutor
 from ..guard.schema import validate_action, sanitize_output, input_validator
 from ..guard.consent import get_consent_manager, set_consent_manager, ConsentManager, request_operation_consent
 from ..config import get_config
+from .._text import truncated_str, preview
+from ..memory.plan_cache import PlanCache, tools_signature
 
 # Logger will be configured by config system
 logger = logging.getLogger(__name__)
 
+class _Console:
+    """Collects run_agent's output lines and writes them to stdout in one call per flush"""
+    
+    def __init__(self):
+        self._lines = []
+    
+    def line(self, text: str = ""):
+        self._lines.append(text)
+    
+    def flush(self):
+        if self._lines:
+            self._lines.append("")
+            sys.stdout.write("\n".join(self._lines))
+            sys.stdout.flush()
+            self._lines.clear()
+
+
+@dataclass
+class _RunContext:
+    """Values fixed for one run_agent call, shared by the action handlers"""
+    goal: str
+    config: Any
+    ui: _Console
+    quiet_mode: bool
+    show_thinking: bool
+    interactive_consent: bool
+    consent_required: Mapping[str, bool]  # resolved once per run from the consent settings
+    tool_specs: Dict[str, ToolSpec]
+    replay: List[Dict[str, Any]]
+    plan_cache: Optional[PlanCache] = None
+    tools_hash: Optional[str] = None
+    replayed_plan: bool = False
+
 async def run_agent(goal: str, max_steps: int = 4, show_thinking: bool = False, quiet_mode: bool = False, interactive_consent: bool = None) -> Dict[str, Any]:
     # Validate user input
     if not input_validator.validate_user_input(goal):
@@ -31,48 +74,98 @@ async def run_agent(goal: str, max_steps: int = 4, show_thinking: bool = False,
     )
     
     # Configure safe directories from config
-    consent_manager.safe_directories = set(config.consent.safe_directories)
+    consent_manager.safe_directories = config.consent.safe_directories
     
     # Set the global consent manager
     set_consent_manager(consent_manager)
     
+    # Each run gets its own sandbox, so concurrent runs keep separate temp dirs
+    set_sandbox(SandboxExecutor())
+    
+    # Output is collected per step and written in one call at each flush
+    ui = _Console()
+    
     if interactive_consent and not quiet_mode:
-        print("🔐 Interactive consent mode is ENABLED")
-        print("   The agent will ask for permission before file operations")
-        print("   You can approve/deny each operation or set session-wide preferences")
-        print()
+        ui.line("🔐 Interactive consent mode is ENABLED")
+        ui.line("   The agent will ask for permission before file operations")
+        ui.line("   You can approve/deny each operation or set session-wide preferences")
+        ui.line()
     
     state = AgentState(goal=goal)
     
-    # Store the goal in memory
-    state.remember(f"Agent goal: {goal}", "episodic", {"type": "goal", "step": -1})
+    # Store the goal in memory, with the first step's writes
+    state.queue_remember(f"Agent goal: {goal}", "episodic", {"type": "goal", "step": -1})
     
     logger.info(f"Starting agent with goal: {goal}")
     
     # Show goal unless in quiet mode
     if not quiet_mode:
-        print("=" * 60)
-        print(f"🎯 GOAL: {goal}")
-        print("=" * 60)
+        ui.line("=" * 60)
+        ui.line(f"🎯 GOAL: {goal}")
+        ui.line("=" * 60)
         
         if show_thinking:
-            print("🧠 AGENT THINKING IN REAL-TIME...")
-            print("-" * 40)
+            ui.line("🧠 AGENT THINKING IN REAL-TIME...")
+            ui.line("-" * 40)
+    
+    # The tool registry does not change during a run
+    tool_list = tools.list()
+    tool_specs = {spec.name: spec for spec in tool_list}
+    
+    # Actions queued ahead of planning: a direct answer to a plain arithmetic
+    # goal, or tool calls replayed from a similar, previously finished goal
+    plan_cache = None
+    tools_hash = None
+    replay = []
+    replay_note = "♻️  Step {step}: Replaying cached plan..."
+    direct_answer = _direct_answer(goal) if config.runtime.enable_direct_answers else None
+    if direct_answer is not None:
+        replay = [{"type": "finish", "output": direct_answer}]
+        replay_note = "⚡ Step {step}: Answering directly..."
+        logger.info(f"Answering goal directly: {direct_answer}")
+    elif config.runtime.enable_plan_cache and state.memory_system:
+        plan_cache = state.memory_system.plan_cache
+        tools_hash = tools_signature(list(tool_specs))
+        try:
+            replay = plan_cache.lookup(goal, tools_hash) or []
+        except Exception as e:
+            logger.warning(f"Plan cache lookup failed: {e}")
+    
+    ctx = _RunContext(
+        goal=goal,
+        config=config,
+        ui=ui,
+        quiet_mode=quiet_mode,
+        show_thinking=show_thinking,
+        interactive_consent=interactive_consent,
+        consent_required=_consent_requirements(config, interactive_consent),
+        tool_specs=tool_specs,
+        replay=replay,
+        plan_cache=plan_cache,
+        tools_hash=tools_hash,
+        replayed_plan=bool(replay),
+    )
     
     for step in range(max_steps):
         try:
             # Get relevant context from memory for planning
             context = state.get_context(goal, max_items=5)
             
-            if show_thinking:
-                print(f"\n🤔 Step {step + 1}: Planning next action...")
-            
-            action = plan_next(state, tools.list())
+            if replay:
+                action = replay.pop(0)
+                if show_thinking:
+                    ui.line("\n" + replay_note.format(step=step + 1))
+            else:
+                if show_thinking:
+                    ui.line(f"\n🤔 Step {step + 1}: Planning next action...")
+                ui.flush()  # show progress before the (slow) planner call
+                action = plan_next(state, tool_list)
             
             # Validate action for safety
             try:
                 action = validate_action(action)
             except ValueError as e:
+                replay.clear()
                 error_msg = f"Action validation failed: {e}"
                 logger.error(error_msg)
                 state.history.append({"step": step, "error": error_msg})
@@ -81,192 +174,47 @@ async def run_agent(goal: str, max_steps: int = 4, show_thinking: bool = False,
             state.history.append({"step": step, "action": action})
             
             # Store action in memory
-            action_desc = f"Step {step}: {action.get('type', 'unknown')} action"
-            if action.get('type') == 'tool':
+            action_type = action.get('type', 'unknown')
+            action_desc = f"Step {step}: {action_type} action"
+            if action_type == 'tool':
                 action_desc += f" using {action.get('name')} with args {action.get('args', {})}"
-            elif action.get('type') == 'think':
+            elif action_type == 'think':
                 action_desc += f": {action.get('reasoning', 'thinking...')}"
             
-            state.remember(action_desc, "episodic", {"type": "action", "step": step})
+            state.queue_remember(action_desc, "episodic", {"type": "action", "step": step})
             
-            if action.get("type") == "tool":
-                tool_name = action.get("name", "unknown")
-                tool_args = action.get("args", {})
-                
-                # Show tool usage unless in quiet mode
-                if not quiet_mode:
-                    print(f"\n🔧 Step {step + 1}: Using {tool_name}")
-                
-                if show_thinking:
-                    args_preview = str(tool_args)
-                    if len(args_preview) > 60:
-                        args_preview = args_preview[:57] + "..."
-                    print(f"   Args: {args_preview}")
-                
-                spec = tools.get(action["name"])
-                if spec is None:
-                    error_msg = f"Tool '{action['name']}' not found"
-                    logger.error(error_msg)
-                    state.history.append({"step": step, "error": error_msg})
-                    if not quiet_mode:
-                        print(f"   ❌ Error: {error_msg}")
-                    continue
-                
-                # Check for user consent if this is a potentially risky operation
-                needs_consent = await _check_if_consent_needed(tool_name, tool_args, config, interactive_consent)
-                
-                if needs_consent:
-                    # Prepare consent request details
-                    consent_details = {"args": tool_args}
-                    target = _extract_operation_target(tool_name, tool_args)
-                    
-                    # Request consent
-                    consent_granted = await request_operation_consent(
-                        operation=tool_name,
-                        target=target,
-                        details=consent_details
-                    )
-                    
-                    if not consent_granted:
-                        error_msg = f"Operation '{tool_name}' denied by user"
-                        logger.info(error_msg)
-                        state.history.append({"step": step, "consent_denied": True, "operation": tool_name})
-                        
-                        if not quiet_mode:
-                            print(f"   🚫 Operation denied by user")
-                        
-                        # Store consent denial in memory
-                        state.remember(f"User denied operation: {tool_name} on {target}", "episodic", 
-                                     {"type": "consent_denied", "step": step, "operation": tool_name})
-                        
-                        # Check for repeated denials to prevent infinite loops
-                        denial_count = sum(1 for entry in state.history[-5:] 
-                                         if entry.get("consent_denied") and entry.get("operation") == tool_name)
-                        
-                        if denial_count >= 2:
-                            # Force finish after 2 denials of the same operation
-                            logger.warning(f"Stopping after {denial_count} denials of {tool_name}")
-                            if not quiet_mode:
-                                print(f"   ⚠️  Stopping: repeated denials of {tool_name}")
-                            
-                            # Directly execute finish logic
-                            final_result = f"I cannot complete this task because the user has denied permission for '{tool_name}' operations. Please manually perform this operation or grant permission if you'd like me to proceed."
-                            
-                            if not quiet_mode:
-                                print(f"\n✅ Step {step + 1}: Task completed!")
-                            
-                            # Show final result
-                            print("=" * 60)
-                            print(f"🎉 FINAL RESULT:")
-                            print(f"   {final_result}")
-                            print("=" * 60)
-                            
-                            state.history.append({"step": step, "final_result": final_result})
-                            state.remember(f"Task completed: {final_result}", "episodic", 
-                                         {"type": "completion", "step": step})
-                            
-                            return {
-                                "trace_id": state.trace_id,
-                                "result": final_result,
-                                "history": state.history,
-                                "context": state.get_context(goal, max_items=3)
-                            }
-                        
-                        continue
-                
-                result = await run_tool(spec, action.get("args", {}))
-                
-                # Sanitize tool output
-                result = sanitize_output(result)
-                
-                state.history.append({"step": step, "observation": result})
-                
-                if not quiet_mode:
-                    if isinstance(result, dict) and 'error' in result:
-                        print(f"   ❌ Failed: {result['error']}")
-                    else:
-                        print(f"   ✅ Completed")
-                    
-                    if show_thinking:
-                        # Show brief result preview
-                        if isinstance(result, dict):
-                            for key in ['result', 'output', 'content', 'success']:
-                                if key in result:
-                                    val = str(result[key])
-                                    if len(val) > 80:
-                                        val = val[:77] + "..."
-                                    print(f"   📋 {key}: {val}")
-                                    break
-                
-                # Store tool result in memory
-                result_str = str(result)[:500]  # Truncate long results
-                state.remember(f"Tool {action['name']} result: {result_str}", "semantic", 
-                             {"type": "tool_result", "step": step, "tool": action['name']})
-                
-                logger.info(f"Step {step}: Used tool {action['name']}")
-                
-            elif action.get("type") == "think":
-                reasoning = action.get("reasoning", "thinking...")
-                
-                if not quiet_mode:
-                    print(f"\n💭 Step {step + 1}: Thinking...")
-                if show_thinking and not quiet_mode:
-                    lines = reasoning.split('\n')
-                    for line in lines:
-                        if line.strip():
-                            print(f"   {line.strip()}")
-                
-                state.history.append({"step": step, "thought": reasoning})
-                state.mem.notes[f"thought_{step}"] = reasoning
-                
-                # Store reasoning in memory
-                state.remember(f"Reasoning at step {step}: {reasoning}", "semantic", 
-                             {"type": "reasoning", "step": step})
-                
-                logger.info(f"Step {step}: Thinking - {reasoning[:100]}...")
-                
-            elif action.get("type") == "finish":
-                final_result = action.get("output", "")
-                
-                if not quiet_mode:
-                    print(f"\n✅ Step {step + 1}: Task completed!")
-                
-                # Always show final result (even in quiet mode)
-                print("=" * 60)
-                print(f"🎉 FINAL RESULT:")
-                print(f"   {final_result}")
-                print("=" * 60)
-                
-                # Store final result in memory
-                state.remember(f"Final result: {final_result}", "episodic", 
-                             {"type": "result", "step": step, "goal": goal})
-                
-                logger.info(f"Agent finished at step {step}")
-                
-                return {
-                    "trace_id": state.trace_id, 
-                    "result": final_result, 
-                    "history": state.history,
-                    "memory_summary": state.get_context(goal, max_items=3)
-                }
+            handler = _ACTION_HANDLERS.get(action_type)
+            if handler is None:
+                continue
+            outcome = await handler(state, action, step, ctx)
+            if outcome is not None:
+                return outcome
                 
         except Exception as e:
+            replay.clear()
             error_msg = f"Error at step {step}: {str(e)}"
             logger.error(error_msg)
             state.history.append({"step": step, "error": error_msg})
             
             # Store error in memory
-            state.remember(error_msg, "episodic", {"type": "error", "step": step})
+            state.queue_remember(error_msg, "episodic", {"type": "error", "step": step})
+        finally:
+            ui.flush()
+            try:
+                state.flush_memory()  # this step's memory writes, stored as one batch
+            except Exception as e:
+                logger.error(f"Could not store memories for step {step}: {e}")
     
     logger.info(f"Agent reached max steps ({max_steps})")
     
     # Show clean max steps message (always shown, even in quiet mode)
     if not quiet_mode:
-        print("\n⏰ Reached maximum steps limit")
-    print("=" * 60)
-    print(f"🎉 FINAL RESULT:")
-    print(f"   Task partially completed after {max_steps} steps")
-    print("=" * 60)
+        ui.line("\n⏰ Reached maximum steps limit")
+    ui.line("=" * 60)
+    ui.line(f"🎉 FINAL RESULT:")
+    ui.line(f"   Task partially completed after {max_steps} steps")
+    ui.line("=" * 60)
+    ui.flush()
     
     return {
         "trace_id": state.trace_id, 
@@ -276,36 +224,398 @@ async def run_agent(goal: str, max_steps: int = 4, show_thinking: bool = False,
     }
 
 
-async def _check_if_consent_needed(tool_name: str, tool_args: Dict[str, Any], config, interactive_consent: bool) -> bool:
-    """Check if a tool operation requires user consent"""
+async def _handle_tool(state: AgentState, action: Dict[str, Any], step: int, ctx: _RunContext) -> Optional[Dict[str, Any]]:
+    """Run a single tool call, asking for consent first when required"""
+    ui, quiet_mode, show_thinking = ctx.ui, ctx.quiet_mode, ctx.show_thinking
+    tool_name = action.get("name", "unknown")
+    tool_args = action.get("args", {})
     
-    # If consent is disabled for this run, no consent needed
-    if not interactive_consent:
-        return False
+    # Show tool usage unless in quiet mode
+    if not quiet_mode:
+        ui.line(f"\n🔧 Step {step + 1}: Using {tool_name}")
     
-    # File operations that typically require consent
-    file_operations = {
-        "file.write": config.consent.require_consent_for_write,
-        "file.delete": config.consent.require_consent_for_delete,
-        "file.mkdir": config.consent.require_consent_for_write,
-    }
+    if show_thinking:
+        ui.line(f"   Args: {preview(tool_args, 60)}")
     
-    # Execution operations that require consent
-    execution_operations = {
-        "shell.exec": config.consent.require_consent_for_execute,
-        "code.python": config.consent.require_consent_for_execute,
-    }
+    spec = ctx.tool_specs.get(tool_name)
+    if spec is None:
+        error_msg = f"Tool '{tool_name}' not found"
+        logger.error(error_msg)
+        state.history.append({"step": step, "error": error_msg})
+        if not quiet_mode:
+            ui.line(f"   ❌ Error: {error_msg}")
+        return None
+    
+    # Check for user consent if this is a potentially risky operation
+    if not await _approve_tool(tool_name, tool_args, ctx):
+        return _record_denial(state, tool_name, tool_args, step, ctx)
+    
+    cache_key = _tool_cache_slot(state, tool_name, tool_args, ctx)
+    if cache_key is not None and cache_key in state.tool_cache:
+        result = state.tool_cache[cache_key]
+        state.history.append({"step": step, "observation": result, "cached": True})
+    else:
+        result = await run_tool(spec, tool_args)
+        
+        # Sanitize tool output
+        result = sanitize_output(result)
+        
+        entry = {"step": step, "observation": result}
+        if cache_key is not None:
+            entry["cached"] = False
+            _cache_result(state, cache_key, result)
+        state.history.append(entry)
     
-    # Read operations (may auto-approve if configured)
-    read_operations = {
-        "file.read": not config.consent.auto_approve_read_operations,
-        "file.list": not config.consent.auto_approve_read_operations,
+    failed = isinstance(result, dict) and 'error' in result
+    if failed:
+        ctx.replay.clear()  # let the planner take over from here
+    
+    if not quiet_mode:
+        if failed:
+            ui.line(f"   ❌ Failed: {result['error']}")
+        else:
+            ui.line(f"   ✅ Completed")
+        
+        if show_thinking:
+            # Show brief result preview
+            if isinstance(result, dict):
+                for key in ['result', 'output', 'content', 'success']:
+                    if key in result:
+                        ui.line(f"   📋 {key}: {preview(result[key], 80)}")
+                        break
+    
+    # Store tool result in memory
+    result_str = truncated_str(result, 500)  # Truncate long results
+    state.queue_remember(f"Tool {tool_name} result: {result_str}", "semantic", 
+                       {"type": "tool_result", "step": step, "tool": tool_name})
+    
+    logger.info(f"Step {step}: Used tool {tool_name}")
+    return None
+
+
+async def _approve_tool(name: str, args: Dict[str, Any], ctx: _RunContext) -> bool:
+    """Whether a tool call may run, asking for consent when the run requires it"""
+    if not ctx.consent_required.get(name, False):
+        return True
+    ctx.ui.flush()
+    return await request_operation_consent(
+        operation=name,
+        target=_extract_operation_target(name, args),
+        details={"args": args}
+    )
+
+
+def _record_denial(state: AgentState, tool_name: str, tool_args: Dict[str, Any], step: int, ctx: _RunContext) -> Optional[Dict[str, Any]]:
+    """Record a denied tool call; returns run_agent's result if repeated denials end the run"""
+    ui, quiet_mode = ctx.ui, ctx.quiet_mode
+    target = _extract_operation_target(tool_name, tool_args)
+    ctx.replay.clear()
+    error_msg = f"Operation '{tool_name}' denied by user"
+    logger.info(error_msg)
+    state.history.append({"step": step, "consent_denied": True, "operation": tool_name})
+    
+    if not quiet_mode:
+        ui.line(f"   🚫 Operation denied by user")
+    
+    # Store consent denial in memory
+    state.queue_remember(f"User denied operation: {tool_name} on {target}", "episodic", 
+                       {"type": "consent_denied", "step": step, "operation": tool_name})
+    
+    # Check for repeated denials to prevent infinite loops: a second
+    # denial of the same operation within the last 5 history entries
+    entry_index = len(state.history) - 1
+    previous_denial = state.last_denials.get(tool_name)
+    state.last_denials[tool_name] = entry_index
+    
+    if previous_denial is not None and previous_denial > entry_index - _DENIAL_WINDOW:
+        # Force finish after 2 denials of the same operation
+        logger.warning(f"Stopping after repeated denials of {tool_name}")
+        if not quiet_mode:
+            ui.line(f"   ⚠️  Stopping: repeated denials of {tool_name}")
+        
+        # Directly execute finish logic
+        final_result = f"I cannot complete this task because the user has denied permission for '{tool_name}' operations. Please manually perform this operation or grant permission if you'd like me to proceed."
+        
+        if not quiet_mode:
+            ui.line(f"\n✅ Step {step + 1}: Task completed!")
+        
+        # Show final result
+        ui.line("=" * 60)
+        ui.line(f"🎉 FINAL RESULT:")
+        ui.line(f"   {final_result}")
+        ui.line("=" * 60)
+        
+        state.history.append({"step": step, "final_result": final_result})
+        state.queue_remember(f"Task completed: {final_result}", "episodic", 
+                           {"type": "completion", "step": step})
+        
+        return {
+            "trace_id": state.trace_id,
+            "result": final_result,
+            "history": state.history,
+            "context": state.get_context(ctx.goal, max_items=3)
+        }
+    
+    return None
+
+
+def _tool_cache_slot(state: AgentState, tool_name: str, tool_args: Dict[str, Any], ctx: _RunContext) -> Optional[str]:
+    """Cache key for a call to a side-effect-free tool, else None
+    
+    Any other tool may change what the cached calls would return, so a call
+    to one resets the cache.
+    """
+    if tool_name in ctx.config.runtime.cacheable_tools:
+        return _tool_cache_key(tool_name, tool_args)
+    state.tool_cache.clear()
+    return None
+
+
+def _cache_result(state: AgentState, cache_key: str, result: Any):
+    """Keep a tool result for reuse, unless the call failed"""
+    if not (isinstance(result, dict) and 'error' in result):
+        state.tool_cache[cache_key] = result
+
+
+async def _handle_tool_batch(state: AgentState, action: Dict[str, Any], step: int, ctx: _RunContext) -> Optional[Dict[str, Any]]:
+    """Run independent tool calls of one step concurrently"""
+    ui = ctx.ui
+    calls = action["calls"]
+    names = [call["name"] for call in calls]
+    
+    if not ctx.quiet_mode:
+        ui.line(f"\n🔧 Step {step + 1}: Using {len(calls)} tools in parallel: {', '.join(names)}")
+    
+    # Consent prompts are answered in call order before anything runs
+    approvals = await asyncio.gather(*(_approve_tool(c["name"], c["args"], ctx) for c in calls))
+    for call, approved in zip(calls, approvals):
+        if not approved:
+            outcome = _record_denial(state, call["name"], call["args"], step, ctx)
+            if outcome is not None:
+                return outcome
+    
+    ui.flush()
+    results = await _run_tool_batch(state, calls, approvals, ctx)
+    state.history.append({"step": step, "observations": results})
+    
+    if any(isinstance(r, dict) and 'error' in r for r in results):
+        ctx.replay.clear()
+    
+    for name, result in zip(names, results):
+        if not ctx.quiet_mode:
+            if isinstance(result, dict) and 'error' in result:
+                ui.line(f"   ❌ {name} failed: {result['error']}")
+            else:
+                ui.line(f"   ✅ {name} completed")
+        
+        # Store tool result in memory
+        result_str = truncated_str(result, 500)  # Truncate long results
+        state.queue_remember(f"Tool {name} result: {result_str}", "semantic", 
+                           {"type": "tool_result", "step": step, "tool": name})
+    
+    logger.info(f"Step {step}: Used tools {', '.join(names)} in parallel")
+    return None
+
+
+async def _handle_think(state: AgentState, action: Dict[str, Any], step: int, ctx: _RunContext) -> Optional[Dict[str, Any]]:
+    """Record a reasoning step"""
+    reasoning = action.get("reasoning", "thinking...")
+    
+    if not ctx.quiet_mode:
+        ctx.ui.line(f"\n💭 Step {step + 1}: Thinking...")
+    if ctx.show_thinking and not ctx.quiet_mode:
+        lines = reasoning.split('\n')
+        for line in lines:
+            if line.strip():
+                ctx.ui.line(f"   {line.strip()}")
+    
+    state.history.append({"step": step, "thought": reasoning})
+    state.mem.notes[f"thought_{step}"] = reasoning
+    
+    # Store reasoning in memory
+    state.queue_remember(f"Reasoning at step {step}: {reasoning}", "semantic", 
+                       {"type": "reasoning", "step": step})
+    
+    logger.info(f"Step {step}: Thinking - {reasoning[:100]}...")
+    return None
+
+
+async def _handle_finish(state: AgentState, action: Dict[str, Any], step: int, ctx: _RunContext) -> Optional[Dict[str, Any]]:
+    """Report the final result and end the run"""
+    ui = ctx.ui
+    final_result = action.get("output", "")
+    
+    if not ctx.quiet_mode:
+        ui.line(f"\n✅ Step {step + 1}: Task completed!")
+    
+    # Always show final result (even in quiet mode)
+    ui.line("=" * 60)
+    ui.line(f"🎉 FINAL RESULT:")
+    ui.line(f"   {final_result}")
+    ui.line("=" * 60)
+    
+    # Store final result in memory
+    state.queue_remember(f"Final result: {final_result}", "episodic", 
+                       {"type": "result", "step": step, "goal": ctx.goal})
+    
+    if ctx.plan_cache is not None and not ctx.replayed_plan:
+        try:
+            ctx.plan_cache.store(ctx.goal, ctx.tools_hash, _successful_tool_actions(state.history))
+        except Exception as e:
+            logger.warning(f"Could not cache plan: {e}")
+    
+    logger.info(f"Agent finished at step {step}")
+    
+    return {
+        "trace_id": state.trace_id, 
+        "result": final_result, 
+        "history": state.history,
+        "memory_summary": state.get_context(ctx.goal, max_items=3)
     }
+
+
+# Action type -> handler; a handler returns run_agent's result to end the run, or None
+_ACTION_HANDLERS: Dict[str, Callable[..., Awaitable[Optional[Dict[str, Any]]]]] = {
+    "tool": _handle_tool,
+    "tool_batch": _handle_tool_batch,
+    "think": _handle_think,
+    "finish": _handle_finish,
+}
+
+
+async def _run_tool_batch(state: AgentState, calls, approvals, ctx: _RunContext):
+    """Run independent tool calls concurrently, returning one sanitized result per call
+    
+    Denied calls get an error result without running, and side-effect-free
+    calls share the run's tool cache with single tool actions.
+    """
+    runs = [approved and c["name"] in ctx.tool_specs for c, approved in zip(calls, approvals)]
+    cache_keys = [
+        _tool_cache_slot(state, c["name"], c["args"], ctx) if will_run else None
+        for c, will_run in zip(calls, runs)
+    ]
+    # A call to any other tool runs alongside the cacheable ones and may change
+    # what they return, so none of the batch's results are kept
+    keep_results = all(key is not None for key, will_run in zip(cache_keys, runs) if will_run)
+    
+    async def run(name: str, args: Dict[str, Any], approved: bool, cache_key: Optional[str]):
+        if not approved:
+            return {"error": f"Operation '{name}' denied by user"}
+        if cache_key is not None and cache_key in state.tool_cache:
+            return state.tool_cache[cache_key]
+        spec = ctx.tool_specs.get(name)
+        if spec is None:
+            return {"error": f"Tool '{name}' not found"}
+        return sanitize_output(await run_tool(spec, args))
+    
+    results = await asyncio.gather(
+        *(run(c["name"], c["args"], ok, key) for c, ok, key in zip(calls, approvals, cache_keys)),
+        return_exceptions=True
+    )
+    results = [
+        sanitize_output({"error": str(r)}) if isinstance(r, BaseException) else r
+        for r in results
+    ]
+    if keep_results:
+        for cache_key, result in zip(cache_keys, results):
+            if cache_key is not None:
+                _cache_result(state, cache_key, result)
+    return results
+
+
+# Two denials of one operation within this many history entries end the run
+_DENIAL_WINDOW = 5
+
+
+# "Calculate 3 * 4", "what is (2 + 5) / 7?" - numbers and + - * / % ( ) only
+_DIRECT_ARITHMETIC_RE = re.compile(
+    r"^\s*(?:calculate|compute|evaluate|what\s+is|what's)\s+([\d\s.+\-*/%()]*\d[\d\s.+\-*/%()]*?)\s*[?.!]?\s*$",
+    re.IGNORECASE
+)
+
+
+def _direct_answer(goal: str) -> Optional[str]:
+    """Answer for a goal that is plain arithmetic, or None if it needs planning"""
+    match = _DIRECT_ARITHMETIC_RE.match(goal)
+    if not match:
+        return None
+    expression = " ".join(match.group(1).split())
+    # Require an operator, and leave powers (which can be huge) to the math tool
+    if "**" in expression or not any(op in expression for op in "+-*/%"):
+        return None
+    try:
+        value = eval(compile(expression, "<goal>", "eval"), {"__builtins__": {}}, {})
+    except (SyntaxError, ArithmeticError, TypeError, ValueError, RecursionError, MemoryError):
+        return None
+    if isinstance(value, float):
+        value = round(value, 12)  # hide binary rounding noise such as 0.1 + 0.2
+        if value.is_integer():
+            value = int(value)
+    return f"{expression} = {value}"
+
+
+def _tool_cache_key(tool_name: str, tool_args: Dict[str, Any]) -> str:
+    """Key for a tool call: the tool name plus a digest of its canonical JSON args"""
+    canonical = json.dumps(tool_args, sort_keys=True, default=str)
+    return f"{tool_name}:{hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()}"
+
+
+def _successful_tool_actions(history):
+    """Tool actions in history whose observation was not an error, in order"""
+    actions = []
+    pending = {}
+    for entry in history:
+        action = entry.get("action")
+        if action and action.get("type") == "tool":
+            pending[entry["step"]] = action
+        elif "observation" in entry and entry["step"] in pending:
+            observation = entry["observation"]
+            action = pending.pop(entry["step"])
+            if not (isinstance(observation, dict) and "error" in observation):
+                actions.append(action)
+    return actions
+
+
+def _check_if_consent_needed(tool_name: str, tool_args: Dict[str, Any], config, interactive_consent: bool) -> bool:
+    """Check if a tool operation requires user consent"""
+    return _consent_requirements(config, interactive_consent).get(tool_name, False)
+
+
+_NO_CONSENT: Mapping[str, bool] = MappingProxyType({})
+
+
+def _consent_requirements(config, interactive_consent: bool) -> Mapping[str, bool]:
+    """Tool name -> whether it needs consent, under the current consent settings"""
     
-    # Check specific operation requirements
-    all_operations = {**file_operations, **execution_operations, **read_operations}
+    # If consent is disabled for this run, no consent needed
+    if not interactive_consent:
+        return _NO_CONSENT
     
-    return all_operations.get(tool_name, False)
+    consent = config.consent
+    return _consent_table(
+        consent.require_consent_for_write,
+        consent.require_consent_for_delete,
+        consent.require_consent_for_execute,
+        consent.auto_approve_read_operations,
+    )
+
+
+@lru_cache(maxsize=16)
+def _consent_table(require_write: bool, require_delete: bool, require_execute: bool,
+                   auto_approve_read: bool) -> Mapping[str, bool]:
+    """Tool name -> whether it needs consent, for one combination of consent settings"""
+    return MappingProxyType({
+        # File operations that typically require consent
+        "file.write": require_write,
+        "file.delete": require_delete,
+        "file.mkdir": require_write,
+        # Execution operations that require consent
+        "shell.exec": require_execute,
+        "code.python": require_execute,
+        # Read operations (may auto-approve if configured)
+        "file.read": not auto_approve_read,
+        "file.list": not auto_approve_read,
+    })
 
 
 def _extract_operation_target(tool_name: str, tool_args: Dict[str, Any]) -> str:
@@ -316,13 +626,8 @@ def _extract_operation_target(tool_name: str, tool_args: Dict[str, Any]) -> str:
     
     for field in target_fields:
         if field in tool_args:
-            value = tool_args[field]
-            if isinstance(value, str):
-                # Truncate long values for display
-                if len(value) > 100:
-                    return value[:97] + "..."
-                return value
-            return str(value)
+            # Truncate long values for display
+            return preview(tool_args[field], 100)
     
     # Fallback to tool name if no specific target found
     return f"<{tool_name} operation>"
@@ -1,7 +1,9 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, InitVar
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 import uuid
-from ..memory.store import IntegratedMemorySystem
+
+if TYPE_CHECKING:
+    from ..memory.store import IntegratedMemorySystem
 
 @dataclass
 class Memory:
@@ -16,26 +18,58 @@ class AgentState:
     mem: Memory = field(default_factory=Memory)
     budget_tokens: int = 8000
     trace_id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    memory_system: Optional[IntegratedMemorySystem] = None
+    memory_system: InitVar[Optional["IntegratedMemorySystem"]] = None  # built on first use if None
+    _memory_system: Optional["IntegratedMemorySystem"] = field(default=None, init=False, repr=False)
+    _pending_memory: List[Tuple[str, str, Optional[Dict[str, Any]]]] = field(default_factory=list, init=False, repr=False)
+    tool_cache: Dict[str, Any] = field(default_factory=dict)  # call key -> sanitized result
+    last_denials: Dict[str, int] = field(default_factory=dict)  # tool -> history index of its last consent denial
     
-    def __post_init__(self):
-        """Initialize memory system if not provided"""
-        if self.memory_system is None:
-            self.memory_system = IntegratedMemorySystem()
+    def __post_init__(self, memory_system: Optional["IntegratedMemorySystem"]):
+        self._memory_system = memory_system
     
     def remember(self, content: str, memory_type: str = "semantic", metadata: Optional[Dict[str, Any]] = None):
         """Store information in the memory system"""
         if self.memory_system:
+            self.flush_memory()
             return self.memory_system.remember(content, memory_type, metadata)
     
+    def queue_remember(self, content: str, memory_type: str = "semantic", metadata: Optional[Dict[str, Any]] = None):
+        """Queue information to be stored by the next flush_memory"""
+        self._pending_memory.append((content, memory_type, metadata))
+    
+    def flush_memory(self):
+        """Store all queued information in the memory system in one batch"""
+        if self._pending_memory:
+            entries, self._pending_memory = self._pending_memory, []
+            self.memory_system.remember_many(entries)
+    
     def recall(self, query: str, memory_type: str = "semantic", top_k: int = 5):
         """Retrieve information from the memory system"""
         if self.memory_system:
+            self.flush_memory()
             return self.memory_system.recall(query, memory_type, top_k)
         return []
     
     def get_context(self, query: str, max_items: int = 10):
         """Get relevant context from all memory types"""
         if self.memory_system:
+            self.flush_memory()
             return self.memory_system.get_context(query, max_items)
         return {}
+
+
+def _get_memory_system(self: AgentState) -> "IntegratedMemorySystem":
+    """Memory system, created on first use (it loads the embedding model and vector store)"""
+    if self._memory_system is None:
+        from ..memory.store import IntegratedMemorySystem
+        self._memory_system = IntegratedMemorySystem()
+    return self._memory_system
+
+
+def _set_memory_system(self: AgentState, memory_system: "IntegratedMemorySystem"):
+    self._memory_system = memory_system
+
+
+# Attached after the dataclass is built, so that AgentState(memory_system=...)
+# keeps its None default instead of taking the property as the default
+AgentState.memory_system = property(_get_memory_system, _set_memory_system, doc=_get_memory_system.__doc__)
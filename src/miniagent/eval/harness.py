@@ -1,13 +1,27 @@
+import sys
 import asyncio
+import re
 import time
-import json
 from typing import Callable, Dict, Any, List, Optional
 from dataclasses import dataclass, field
 from pathlib import Path
 import logging
+from .. import _json
 
 logger = logging.getLogger(__name__)
 
+# asyncio.timeout (3.11+) runs the agent in the current task instead of
+# wrapping it in a new one as wait_for does
+_HAS_TIMEOUT_SCOPE = sys.version_info >= (3, 11)
+
+# Keyword checks used by the built-in suites' success criteria (plain substring
+# matches, case-insensitive), each compiled into one alternation
+_FILE_DONE_RE = re.compile(r"created|written", re.IGNORECASE)
+_AGENT_TOPIC_RE = re.compile(r"agent|ai", re.IGNORECASE)
+_PROBLEM_SOLVING_RE = re.compile(r"solution|approach|strategy|method", re.IGNORECASE)
+_CODE_RE = re.compile(r"def|function|print", re.IGNORECASE)
+_ANALYSIS_RE = re.compile(r"analysis|research|findings|conclusion", re.IGNORECASE)
+
 @dataclass
 class EvalResult:
     """Result of a single evaluation"""
@@ -45,22 +59,27 @@ class EvalSuite:
 class AgentEvaluator:
     """Comprehensive agent evaluation framework"""
     
-    def __init__(self, output_dir: str = "./eval_results"):
+    def __init__(self, output_dir: str = "./eval_results", concurrency: int = 4):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.concurrency = concurrency  # default bound on tasks run at once
     
     async def run_single_task(self, task: EvalTask, agent_fn: Callable[[str, int], Any]) -> EvalResult:
         """Run a single evaluation task"""
-        start_time = time.time()
+        start_time = time.perf_counter()  # monotonic, unaffected by clock changes
         
         try:
             # Run the agent with timeout
-            result = await asyncio.wait_for(
-                agent_fn(task.goal, task.max_steps),
-                timeout=task.timeout_s
-            )
+            if _HAS_TIMEOUT_SCOPE:
+                async with asyncio.timeout(task.timeout_s):
+                    result = await agent_fn(task.goal, task.max_steps)
+            else:
+                result = await asyncio.wait_for(
+                    agent_fn(task.goal, task.max_steps),
+                    timeout=task.timeout_s
+                )
             
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             
             # Determine success
             success = False
@@ -94,10 +113,11 @@ class AgentEvaluator:
                 execution_time=task.timeout_s,
                 output=None,
                 error="Task timed out",
-                metadata={"task_description": task.description}
+                metadata={"task_description": task.description,
+                          "elapsed_time": time.perf_counter() - start_time}
             )
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             return EvalResult(
                 task_id=task.id,
                 success=False,
@@ -108,22 +128,33 @@ class AgentEvaluator:
                 metadata={"task_description": task.description}
             )
     
-    async def run_suite(self, suite: EvalSuite, agent_fn: Callable[[str, int], Any]) -> Dict[str, Any]:
-        """Run a complete evaluation suite"""
+    async def run_suite(self, suite: EvalSuite, agent_fn: Callable[[str, int], Any],
+                        concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Run a complete evaluation suite
+        
+        Up to ``concurrency`` tasks (default: the evaluator's) run at the same time,
+        bounded by a semaphore; results are reported in suite order regardless of
+        completion order.
+        """
         logger.info(f"Running evaluation suite: {suite.name}")
         
-        results = []
         total_tasks = len(suite.tasks)
+        if concurrency is None:
+            concurrency = self.concurrency
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def _run(i: int, task: EvalTask) -> EvalResult:
+            async with semaphore:
+                logger.info(f"Running task {i+1}/{total_tasks}: {task.id}")
+                result = await self.run_single_task(task, agent_fn)
+            status = "passed" if result.success else "failed"
+            logger.info(f"Finished task {i+1}/{total_tasks}: {task.id} ({status}, {result.execution_time:.2f}s)")
+            return result
         
-        for i, task in enumerate(suite.tasks):
-            logger.info(f"Running task {i+1}/{total_tasks}: {task.id}")
-            result = await self.run_single_task(task, agent_fn)
-            results.append(result)
+        results = await asyncio.gather(*(_run(i, task) for i, task in enumerate(suite.tasks)))
         
         # Calculate overall metrics
-        successful_tasks = sum(1 for r in results if r.success)
-        total_score = sum(r.score for r in results)
-        total_time = sum(r.execution_time for r in results)
+        successful_tasks, total_score, total_time = self._aggregate(results)
         
         suite_result = {
             "suite_name": suite.name,
@@ -142,6 +173,18 @@ class AgentEvaluator:
         
         return suite_result
     
+    @staticmethod
+    def _aggregate(results: List[EvalResult]):
+        """Successful task count, total score and total time, in one pass"""
+        successful_tasks = 0
+        total_score = 0.0
+        total_time = 0.0
+        for r in results:
+            successful_tasks += r.success
+            total_score += r.score
+            total_time += r.execution_time
+        return successful_tasks, total_score, total_time
+    
     def _result_to_dict(self, result: EvalResult) -> Dict[str, Any]:
         """Convert EvalResult to dictionary"""
         return {
@@ -160,8 +203,7 @@ class AgentEvaluator:
         filename = f"eval_{results['suite_name']}_{timestamp}.json"
         filepath = self.output_dir / filename
         
-        with open(filepath, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        filepath.write_bytes(_json.dumps_bytes(results, indent=True, default=str))
         
         logger.info(f"Saved evaluation results to {filepath}")
 
@@ -176,7 +218,7 @@ def create_basic_eval_suite() -> EvalSuite:
     # Math calculation task
     def check_math_result(result):
         if isinstance(result, dict) and "result" in result:
-            return "12" in str(result["result"]) or "12.0" in str(result["result"])
+            return "12" in str(result["result"])
         return False
     
     suite.add_task(EvalTask(
@@ -190,7 +232,7 @@ def create_basic_eval_suite() -> EvalSuite:
     # File operations task
     def check_file_result(result):
         if isinstance(result, dict) and "result" in result:
-            return "created" in str(result["result"]).lower() or "written" in str(result["result"]).lower()
+            return bool(_FILE_DONE_RE.search(str(result["result"])))
         return False
     
     suite.add_task(EvalTask(
@@ -204,8 +246,8 @@ def create_basic_eval_suite() -> EvalSuite:
     # Information synthesis task
     def check_synthesis_result(result):
         if isinstance(result, dict) and "result" in result:
-            result_text = str(result["result"]).lower()
-            return len(result_text) > 50 and ("agent" in result_text or "ai" in result_text)
+            result_text = str(result["result"])
+            return len(result_text) > 50 and bool(_AGENT_TOPIC_RE.search(result_text))
         return False
     
     suite.add_task(EvalTask(
@@ -229,8 +271,7 @@ def create_advanced_eval_suite() -> EvalSuite:
     # Problem solving task
     def check_problem_solving(result):
         if isinstance(result, dict) and "result" in result:
-            result_text = str(result["result"]).lower()
-            return any(keyword in result_text for keyword in ["solution", "approach", "strategy", "method"])
+            return bool(_PROBLEM_SOLVING_RE.search(str(result["result"])))
         return False
     
     suite.add_task(EvalTask(
@@ -244,8 +285,7 @@ def create_advanced_eval_suite() -> EvalSuite:
     # Code generation task
     def check_code_generation(result):
         if isinstance(result, dict) and "result" in result:
-            result_text = str(result["result"]).lower()
-            return "def" in result_text or "function" in result_text or "print" in result_text
+            return bool(_CODE_RE.search(str(result["result"])))
         return False
     
     suite.add_task(EvalTask(
@@ -260,7 +300,7 @@ def create_advanced_eval_suite() -> EvalSuite:
     def check_research_analysis(result):
         if isinstance(result, dict) and "result" in result:
             result_text = str(result["result"])
-            return len(result_text) > 200 and any(keyword in result_text.lower() for keyword in ["analysis", "research", "findings", "conclusion"])
+            return len(result_text) > 200 and bool(_ANALYSIS_RE.search(result_text))
         return False
     
     suite.add_task(EvalTask(
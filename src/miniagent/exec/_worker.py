@@ -0,0 +1,55 @@
+"""
+Child process entry point for SandboxExecutor._execute_in_subprocess.
+
+Reads one pickled request (sys.path, resource limits, tool function module and
+qualified name, args) from stdin, applies the limits, runs the function and
+writes a pickled ("ok", result) or ("error", exception) pair to stdout. Run as
+a script so that starting it does not depend on how miniagent was installed.
+"""
+
+import asyncio
+import importlib
+import os
+import pickle
+import sys
+
+
+def _load_function(module_name: str, qualname: str):
+    target = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    return target
+
+
+def main():
+    # Tool output printed to stdout must not corrupt the pickled reply
+    reply = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+
+    data = sys.stdin.buffer.read()
+    if not data:
+        return
+    sys_path, limits, module_name, qualname, args = pickle.loads(data)
+    sys.path[:] = sys_path
+
+    from miniagent.exec.sandbox import _apply_limits
+    _apply_limits(limits)
+
+    try:
+        result = _load_function(module_name, qualname)(args)
+        if asyncio.iscoroutine(result):
+            result = asyncio.run(result)
+        outcome = ("ok", result)
+    except Exception as e:
+        outcome = ("error", e)
+
+    try:
+        payload = pickle.dumps(outcome)
+    except Exception as e:
+        payload = pickle.dumps(("error", RuntimeError(f"Unpicklable tool {outcome[0]}: {e}")))
+    reply.write(payload)
+    reply.close()
+
+
+if __name__ == "__main__":
+    main()
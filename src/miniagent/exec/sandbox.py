@@ -1,14 +1,20 @@
 import asyncio
 import os
+import re
+import sys
+import pickle
 import signal
 import tempfile
 import shutil
 import resource
+import weakref
 import subprocess
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from tenacity import retry, stop_after_attempt, wait_exponential
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +26,7 @@ class SandboxConfig:
     max_cpu_time_s: int = 30
     max_file_size_mb: int = 100
     max_processes: int = 5
+    max_open_files: int = 1024
     allowed_dirs: List[str] = None
     blocked_commands: List[str] = None
     enable_network: bool = True
@@ -35,6 +42,155 @@ class SandboxConfig:
             ]
 
 
+def _substring_pattern(words) -> "re.Pattern":
+    """One case-insensitive alternation matching any of words as a plain substring"""
+    return re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+
+
+# Logged (not blocked) when found in a command
+_SUSPICIOUS_RE = _substring_pattern((
+    "> /dev/", "< /dev/", "exec(", "eval(", "__import__",
+    "subprocess.call", "os.system", "curl http", "wget http"
+))
+
+# Logged when found in code passed to a code execution tool
+_CODE_DANGER_RE = _substring_pattern(("import os", "__import__", "exec(", "eval("))
+
+
+def _command_checker(blocked: Tuple[str, ...]):
+    """Command check specialized to one set of blocked commands
+    
+    The returned function raises SecurityError for a blocked command and logs
+    each distinct suspicious pattern found in it.
+    """
+    blocked_search = _substring_pattern(blocked).search if blocked else None
+    suspicious_finditer = _SUSPICIOUS_RE.finditer
+    
+    def check(command: str):
+        match = blocked_search(command) if blocked_search is not None else None
+        if match:
+            raise SecurityError(f"Blocked command detected: {match.group(0).lower()}")
+        for suspicious in {m.group(0).lower() for m in suspicious_finditer(command)}:
+            logger.warning(f"Suspicious pattern detected: {suspicious}")
+    
+    return check
+
+
+def _remove_tree(path: str):
+    """Delete a directory tree, removing each directory's entries in inode order
+    
+    Unlinking in inode order keeps the filesystem's metadata updates mostly
+    sequential, which is noticeably faster than directory order for large trees.
+    """
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda entry: entry.inode())
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            _remove_tree(entry.path)
+        else:
+            os.unlink(entry.path)
+    os.rmdir(path)
+
+
+def _remove_dir(temp_dir: Path):
+    """Delete a sandbox directory, falling back to shutil.rmtree on errors"""
+    try:
+        if temp_dir.exists():
+            _remove_tree(str(temp_dir))
+    except Exception as e:
+        logger.warning(f"Failed to cleanup temp dir {temp_dir}: {e}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+_cleanup_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _remove_in_background(temp_dir: Path):
+    """Queue temp_dir for deletion; pending deletions still finish before exit"""
+    global _cleanup_executor
+    try:
+        if _cleanup_executor is None:
+            _cleanup_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sandbox-cleanup")
+        _cleanup_executor.submit(_remove_dir, temp_dir)
+    except RuntimeError:  # interpreter shutting down, no new threads
+        _remove_dir(temp_dir)
+
+
+def _remove_dirs(temp_dirs: List[Path]):
+    """Queue every directory in temp_dirs for deletion and empty the list"""
+    for temp_dir in temp_dirs:
+        _remove_in_background(temp_dir)
+    temp_dirs.clear()
+
+
+@lru_cache(maxsize=256)
+def _classify_tool(name: str) -> Tuple[bool, bool]:
+    """Classify a tool name as (dangerous, risky)
+    
+    Dangerous tools get their command or code checked; risky ones run through
+    _execute_in_subprocess. Tool names are few, so each is classified once.
+    """
+    dangerous = any(word in name for word in ('shell', 'exec', 'code'))
+    risky = any(word in name for word in ('shell', 'code', 'file.delete'))
+    return dangerous, risky
+
+
+@lru_cache(maxsize=256)
+def _is_async_tool(fn) -> bool:
+    """Whether a tool function is a coroutine function, looked up once per function"""
+    return asyncio.iscoroutinefunction(fn)
+
+
+async def _call_tool(fn, args: Dict[str, Any]) -> Any:
+    """Call a sync or async tool function and return its result"""
+    try:
+        is_async = _is_async_tool(fn)
+    except TypeError:  # unhashable callable
+        is_async = asyncio.iscoroutinefunction(fn)
+    if is_async:
+        return await fn(args)
+    result = fn(args)
+    if asyncio.iscoroutine(result):  # a plain callable that returned a coroutine
+        result = await result
+    return result
+
+
+# asyncio.timeout (3.11+) runs the tool in the calling task instead of
+# wrapping it in a new one as wait_for does
+_HAS_TIMEOUT_SCOPE = sys.version_info >= (3, 11)
+
+_SHM_DIR = "/dev/shm"
+_WORKER_PATH = str(Path(__file__).with_name("_worker.py"))
+
+
+def _apply_limits(limits: List[Tuple[int, int]]):
+    """Set each (resource, value) limit that does not already have that value"""
+    for limit, value in limits:
+        try:
+            if resource.getrlimit(limit) != (value, value):
+                resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Failed to set resource limit {limit}: {e}")
+
+
+def _importable_name(fn) -> Optional[Tuple[str, str]]:
+    """(module, qualified name) a worker process can import fn by, or None"""
+    module = getattr(fn, "__module__", None)
+    qualname = getattr(fn, "__qualname__", None)
+    if (not module or module == "__main__" or not qualname or "<" in qualname
+            or hasattr(fn, "__self__")):
+        return None
+    return module, qualname
+
+
+def _kill_group(process: asyncio.subprocess.Process):
+    """SIGKILL a worker started with start_new_session and everything it spawned"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
 class SecurityError(Exception):
     """Raised when a security violation is detected"""
     pass
@@ -46,67 +202,71 @@ class SandboxExecutor:
     def __init__(self, config: Optional[SandboxConfig] = None):
         self.config = config or SandboxConfig()
         self.temp_dirs = []
+        # Removes leftover temp dirs when the executor is garbage collected or
+        # at interpreter exit, whichever comes first. Unlike __del__, it runs
+        # before module globals are torn down.
+        weakref.finalize(self, _remove_dirs, self.temp_dirs)
+        self._checker = (None, None)  # (blocked_commands it was built from, checker)
+        # Sandbox dirs go on tmpfs when it is writable and TMPDIR does not say otherwise
+        self._shm = _SHM_DIR if "TMPDIR" not in os.environ and os.access(_SHM_DIR, os.W_OK) else None
+    
+    async def __aenter__(self) -> "SandboxExecutor":
+        return self
     
-    def __del__(self):
-        """Cleanup temporary directories"""
+    async def __aexit__(self, exc_type, exc, tb):
         self.cleanup()
     
     def cleanup(self):
-        """Clean up temporary directories and resources"""
-        for temp_dir in self.temp_dirs:
-            try:
-                if temp_dir.exists():
-                    shutil.rmtree(temp_dir)
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp dir {temp_dir}: {e}")
-        self.temp_dirs.clear()
+        """Clean up temporary directories and resources
+        
+        Directories are deleted by a background thread, so this returns at once.
+        """
+        _remove_dirs(self.temp_dirs)
     
     def create_sandbox_dir(self) -> Path:
-        """Create a temporary directory for sandbox execution"""
-        temp_dir = Path(tempfile.mkdtemp(prefix="miniagent_sandbox_"))
+        """Create a temporary directory for sandbox execution
+        
+        The directory is placed in /dev/shm if it has max_memory_mb free, so
+        sandbox files never touch the disk; otherwise in the default temp dir.
+        """
+        parent = None
+        if self._shm is not None:
+            try:
+                if shutil.disk_usage(self._shm).free >= self.config.max_memory_mb * 1024 * 1024:
+                    parent = self._shm
+            except OSError:
+                pass
+        temp_dir = Path(tempfile.mkdtemp(prefix="miniagent_sandbox_", dir=parent))
         self.temp_dirs.append(temp_dir)
         return temp_dir
     
     def validate_command(self, command: str) -> bool:
         """Check if a command is safe to execute"""
-        command_lower = command.lower().strip()
-        
-        # Check for explicitly blocked commands
-        for blocked in self.config.blocked_commands:
-            if blocked.lower() in command_lower:
-                raise SecurityError(f"Blocked command detected: {blocked}")
-        
-        # Check for suspicious patterns
-        suspicious_patterns = [
-            "> /dev/", "< /dev/", "exec(", "eval(", "__import__",
-            "subprocess.call", "os.system", "curl http", "wget http"
-        ]
-        
-        for pattern in suspicious_patterns:
-            if pattern.lower() in command_lower:
-                logger.warning(f"Suspicious pattern detected: {pattern}")
-        
+        blocked = tuple(self.config.blocked_commands)
+        if self._checker[0] != blocked:
+            # Rebuilt only when the configured blocked commands change
+            self._checker = (blocked, _command_checker(blocked))
+        self._checker[1](command)
         return True
     
+    def _resource_limits(self) -> List[Tuple[int, int]]:
+        """(resource, limit) pairs for the configured sandbox limits"""
+        mb = 1024 * 1024
+        return [
+            (resource.RLIMIT_AS, self.config.max_memory_mb * mb),
+            (resource.RLIMIT_CPU, self.config.max_cpu_time_s),
+            (resource.RLIMIT_FSIZE, self.config.max_file_size_mb * mb),
+            (resource.RLIMIT_NPROC, self.config.max_processes),
+            (resource.RLIMIT_NOFILE, self.config.max_open_files),
+        ]
+    
     def set_resource_limits(self):
-        """Set resource limits for the current process"""
-        try:
-            # Set memory limit
-            max_memory = self.config.max_memory_mb * 1024 * 1024
-            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
-            
-            # Set CPU time limit
-            resource.setrlimit(resource.RLIMIT_CPU, (self.config.max_cpu_time_s, self.config.max_cpu_time_s))
-            
-            # Set file size limit
-            max_file_size = self.config.max_file_size_mb * 1024 * 1024
-            resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_size, max_file_size))
-            
-            # Set process limit
-            resource.setrlimit(resource.RLIMIT_NPROC, (self.config.max_processes, self.config.max_processes))
-            
-        except Exception as e:
-            logger.warning(f"Failed to set resource limits: {e}")
+        """Set resource limits for the current process
+        
+        Limits that already have the requested value are not set again. The
+        open file limit also bounds the descriptors a child has to close.
+        """
+        _apply_limits(self._resource_limits())
     
     async def execute_with_limits(self, spec, args: Dict[str, Any]) -> Any:
         """Execute a tool function with security and resource limits"""
@@ -118,61 +278,113 @@ class SandboxExecutor:
             except Exception as e:
                 raise SecurityError(f"Argument validation failed: {e}")
         
+        is_dangerous, is_risky = _classify_tool(getattr(spec, 'name', ''))
+        
         # Check if this is a potentially dangerous operation
-        if hasattr(spec, 'name') and any(dangerous in spec.name for dangerous in ['shell', 'exec', 'code']):
+        if is_dangerous:
             # Additional validation for code/shell execution
             if 'command' in args:
                 self.validate_command(args['command'])
             if 'code' in args:
                 # Basic code validation (could be enhanced)
                 code = args['code']
-                if any(danger in code.lower() for danger in ['import os', '__import__', 'exec(', 'eval(']):
+                if _CODE_DANGER_RE.search(code):
                     logger.warning("Potentially dangerous code detected")
         
         async def _call():
             # Execute in a separate process for isolation if it's a risky operation
-            if hasattr(spec, 'name') and any(risky in spec.name for risky in ['shell', 'code', 'file.delete']):
+            if is_risky:
                 return await self._execute_in_subprocess(spec, args)
             else:
                 # Execute normally for safe operations
-                res = spec.fn(args)
-                if asyncio.iscoroutine(res):
-                    return await res
-                return res
+                return await _call_tool(spec.fn, args)
         
         try:
+            if _HAS_TIMEOUT_SCOPE:
+                async with asyncio.timeout(spec.timeout_s):
+                    return await _call()
             return await asyncio.wait_for(_call(), timeout=spec.timeout_s)
         except asyncio.TimeoutError:
             raise SecurityError(f"Tool execution timed out after {spec.timeout_s} seconds")
     
     async def _execute_in_subprocess(self, spec, args: Dict[str, Any]) -> Any:
-        """Execute tool in a separate subprocess for isolation"""
-        # For now, just execute normally but with monitoring
-        # In a production system, this would use proper process isolation
+        """Execute tool in a separate subprocess for isolation
+        
+        Each call gets a fresh worker process under the sandbox resource limits,
+        in its own session so that a timeout kills it together with anything it
+        started. Tool functions a worker cannot import by name (lambdas, closures,
+        bound methods) run in-process instead.
+        """
+        name = _importable_name(spec.fn)
+        if name is None:
+            logger.debug(f"Running {getattr(spec, 'name', spec.fn)} in-process: not importable")
+            return await _call_tool(spec.fn, args)
+        
+        # RLIMIT_NPROC counts every process of the user, not just the worker's
+        limits = [(r, v) for r, v in self._resource_limits() if r != resource.RLIMIT_NPROC]
+        request = pickle.dumps((sys.path, limits, *name, args))
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, _WORKER_PATH,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            start_new_session=True,
+        )
         try:
-            result = spec.fn(args)
-            if asyncio.iscoroutine(result):
-                result = await result
-            return result
-        except Exception as e:
-            logger.error(f"Subprocess execution failed: {e}")
+            reply, _ = await process.communicate(request)
+        except BaseException:  # timed out or cancelled
+            _kill_group(process)
+            await process.wait()  # reap it so its pipes are closed with the loop open
             raise
+        
+        try:
+            status, value = pickle.loads(reply)
+        except Exception:
+            logger.error(f"Subprocess execution failed: worker exited with code {process.returncode}")
+            raise RuntimeError(f"Tool worker exited with code {process.returncode}")
+        if status == "error":
+            logger.error(f"Subprocess execution failed: {value}")
+            raise value
+        return value
 
 
 # Global sandbox executor instance
 _sandbox = SandboxExecutor()
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.3, min=0.3, max=1.2))
+# Sandbox set for the current context (an agent run and the tasks it starts);
+# contexts that never set one share the global instance
+_sandbox_var: ContextVar[Optional[SandboxExecutor]] = ContextVar("sandbox", default=None)
+
+
+def _get_sandbox() -> SandboxExecutor:
+    """The sandbox executor for the current context, else the global instance"""
+    sandbox = _sandbox_var.get()
+    return _sandbox if sandbox is None else sandbox
+
+
+def set_sandbox(sandbox: SandboxExecutor):
+    """Set the sandbox executor for the current context
+    
+    Tasks started from this context afterwards use it too, so agents running
+    concurrently in their own tasks keep separate temp dirs and limits.
+    """
+    _sandbox_var.set(sandbox)
+
+_RUN_ATTEMPTS = 2
+_RETRY_DELAY = 0.3
+
+
 async def run_tool(spec, args: Dict[str, Any]) -> Any:
-    """Enhanced tool execution with security sandbox"""
-    try:
-        return await _sandbox.execute_with_limits(spec, args)
-    except SecurityError as e:
-        logger.error(f"Security violation in tool {getattr(spec, 'name', 'unknown')}: {e}")
-        return {"error": f"Security violation: {str(e)}", "blocked": True}
-    except Exception as e:
-        logger.error(f"Tool execution error: {e}")
-        raise
+    """Enhanced tool execution with security sandbox, retried once on failure"""
+    for attempt in range(_RUN_ATTEMPTS):
+        try:
+            return await _get_sandbox().execute_with_limits(spec, args)
+        except SecurityError as e:
+            logger.error(f"Security violation in tool {getattr(spec, 'name', 'unknown')}: {e}")
+            return {"error": f"Security violation: {str(e)}", "blocked": True}
+        except Exception as e:
+            logger.error(f"Tool execution error: {e}")
+            if attempt == _RUN_ATTEMPTS - 1:
+                raise
+        await asyncio.sleep(_RETRY_DELAY * 2 ** attempt)
 
 
 def get_sandbox_stats() -> Dict[str, Any]:
@@ -183,7 +395,7 @@ def get_sandbox_stats() -> Dict[str, Any]:
             "memory_peak_kb": usage.ru_maxrss,
             "cpu_time_user": usage.ru_utime,
             "cpu_time_system": usage.ru_stime,
-            "temp_dirs_active": len(_sandbox.temp_dirs)
+            "temp_dirs_active": len(_get_sandbox().temp_dirs)
         }
     except Exception as e:
         return {"error": str(e)}
@@ -191,4 +403,4 @@ def get_sandbox_stats() -> Dict[str, Any]:
 
 def cleanup_sandbox():
     """Cleanup sandbox resources"""
-    _sandbox.cleanup()
+    _get_sandbox().cleanup()
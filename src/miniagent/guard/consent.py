@@ -5,8 +5,16 @@ This module provides user consent mechanisms for potentially destructive operati
 particularly file operations, giving users explicit control over agent actions.
 """
 
+import asyncio
+import functools
 import logging
-from typing import Dict, Any, Optional, Set, List
+import os
+import re
+import stat
+import sys
+import threading
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Set, List, FrozenSet, Iterable
 from enum import Enum
 from pathlib import Path
 from dataclasses import dataclass
@@ -15,6 +23,35 @@ import json
 logger = logging.getLogger(__name__)
 
 
+# Shell command fragments that make a command high-risk, matched case-insensitively
+_DANGEROUS_SHELL_RE = re.compile("|".join(re.escape(p) for p in (
+    'rm ', 'sudo', 'chmod 777', 'passwd', 'useradd', 'userdel',
+    'mount', 'umount', 'systemctl', 'service', 'iptables', 'ufw',
+    'mkfs', 'dd if=', '>/dev/', 'curl', 'wget', 'nc ', 'netcat'
+)), re.IGNORECASE)
+
+# One ConsentRequest is built per tool call; slot it on Python 3.10+ (no
+# per-instance __dict__). It stays mutable: request_consent sets risk_level.
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+# Fixed parts of the consent prompt, written around the request's own lines
+_CONSENT_HEADER = "\n" + "=" * 60 + "\n🔐 AGENT CONSENT REQUEST\n" + "=" * 60
+_CONSENT_MENU = """
+The agent wants to perform this operation.
+What would you like to do?
+
+Options:
+  [a] Allow this operation
+  [d] Deny this operation
+  [A] Allow ALL operations (session)
+  [D] Deny ALL operations (session)
+  [s] Allow this operation type for this session
+  [?] Show more details
+
+"""
+
+
 class ConsentDecision(Enum):
     """Possible consent decisions"""
     ALLOW = "allow"
@@ -24,7 +61,7 @@ class ConsentDecision(Enum):
     ALLOW_SESSION = "allow_session"
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ConsentRequest:
     """Represents a consent request for an operation"""
     operation: str  # e.g., "file.write", "file.delete"
@@ -39,6 +76,30 @@ class ConsentRequest:
 class ConsentManager:
     """Manages user consent for agent operations"""
     
+    # Safe operations that can be auto-approved
+    safe_operations: FrozenSet[str] = frozenset({
+        "file.read", "file.list", "web.search", "web.fetch", 
+        "math.calc", "text.summarize", "system.info", 
+        "memory.search"
+    })
+    
+    # High-risk operations that always require explicit consent
+    high_risk_operations: FrozenSet[str] = frozenset({
+        "file.delete", "code.python"
+    })
+    
+    # Safe shell commands that don't require consent
+    safe_shell_commands: FrozenSet[str] = frozenset({
+        "date", "pwd", "whoami", "id", "uname", "hostname", 
+        "uptime", "df", "free", "ps", "top", "ls", "cat", 
+        "head", "tail", "wc", "grep", "find", "which", "echo"
+    })
+    
+    # Directory patterns that are considered safe for operations
+    default_safe_directories: FrozenSet[str] = frozenset({
+        "./", "./temp/", "./workspace/", "./output/", "./artifacts/"
+    })
+    
     def __init__(self, interactive: bool = True, auto_approve_safe: bool = True):
         self.interactive = interactive
         self.auto_approve_safe = auto_approve_safe
@@ -46,49 +107,40 @@ class ConsentManager:
         self.session_denials: Set[str] = set()
         self.global_allow_all = False
         self.global_deny_all = False
-        
-        # Safe operations that can be auto-approved
-        self.safe_operations = {
-            "file.read", "file.list", "web.search", "web.fetch", 
-            "math.calc", "text.summarize", "system.info", 
-            "memory.search"
-        }
-        
-        # High-risk operations that always require explicit consent
-        self.high_risk_operations = {
-            "file.delete", "code.python"
-        }
-        
-        # Safe shell commands that don't require consent
-        self.safe_shell_commands = {
-            "date", "pwd", "whoami", "id", "uname", "hostname", 
-            "uptime", "df", "free", "ps", "top", "ls", "cat", 
-            "head", "tail", "wc", "grep", "find", "which", "echo"
-        }
-        
-        # Directory patterns that are considered safe for operations
-        self.safe_directories = {
-            "./", "./temp/", "./workspace/", "./output/", "./artifacts/"
-        }
+        self._prompt_lock: Optional[asyncio.Lock] = None  # created in the running loop
+        # Resolved paths shown in consent prompts. Only for display: safety
+        # checks resolve again, since a symlink may have changed since
+        self._realpath = functools.lru_cache(maxsize=1024)(os.path.realpath)
+        # Resolved against the working directory at construction
+        self.safe_directories = self.default_safe_directories
+    
+    @property
+    def safe_directories(self) -> FrozenSet[str]:
+        """Resolved absolute paths of the directories considered safe"""
+        return self._safe_directories
+    
+    @safe_directories.setter
+    def safe_directories(self, directories: Iterable[str]):
+        # Resolve once here so is_safe_directory only needs set lookups
+        self._safe_directories = frozenset(os.path.realpath(d) for d in directories)
     
     def is_safe_directory(self, path: str) -> bool:
         """Check if a directory is considered safe for operations"""
         try:
-            resolved_path = Path(path).resolve()
-            path_str = str(resolved_path)
+            cwd = os.getcwd()
+            path_str = os.path.realpath(os.path.join(cwd, path))
+            cwd = os.path.realpath(cwd)
             
-            # Check if path is in safe directories
-            for safe_dir in self.safe_directories:
-                safe_resolved = str(Path(safe_dir).resolve())
-                if path_str.startswith(safe_resolved):
+            # Check if the path or any of its parents is a safe directory or
+            # the current working directory
+            candidate = path_str
+            while True:
+                if candidate == cwd or candidate in self.safe_directories:
                     return True
-            
-            # Check if it's in current working directory
-            cwd = str(Path.cwd())
-            if path_str.startswith(cwd):
-                return True
-                
-            return False
+                parent = os.path.dirname(candidate)
+                if parent == candidate:
+                    return False
+                candidate = parent
         except Exception:
             return False
     
@@ -129,24 +181,16 @@ class ConsentManager:
         
         command = request.details['args']['command'].strip()
         
-        # Extract the base command (first word)
-        base_command = command.split()[0] if command else ""
+        # Extract the base command (first word) without splitting the rest
+        base_command = command.split(maxsplit=1)[0] if command else ""
         
         # Safe commands get low risk
         if base_command in self.safe_shell_commands:
             return "low"
         
         # Check for dangerous patterns
-        dangerous_patterns = [
-            'rm ', 'sudo', 'chmod 777', 'passwd', 'useradd', 'userdel',
-            'mount', 'umount', 'systemctl', 'service', 'iptables', 'ufw',
-            'mkfs', 'dd if=', '>/dev/', 'curl', 'wget', 'nc ', 'netcat'
-        ]
-        
-        command_lower = command.lower()
-        for pattern in dangerous_patterns:
-            if pattern in command_lower:
-                return "high"
+        if _DANGEROUS_SHELL_RE.search(command):
+            return "high"
         
         # Moderate risk for other commands
         return "medium"
@@ -158,9 +202,39 @@ class ConsentManager:
     async def request_consent(self, request: ConsentRequest) -> ConsentDecision:
         """Request user consent for an operation"""
         
+        # Global and session answers need no risk assessment
+        decision = self._remembered_decision(request)
+        if decision is not None:
+            return decision
+        
         # Update risk level
         request.risk_level = self.assess_risk_level(request)
         
+        decision = self._risk_decision(request)
+        if decision is not None:
+            return decision
+        
+        # Interactive consent prompt. Prompts are shown one at a time, and an
+        # answer given while this request waited (allow all, allow for the
+        # session) may already cover it.
+        if self._prompt_lock is None:
+            self._prompt_lock = asyncio.Lock()
+        async with self._prompt_lock:
+            decision = self._automatic_decision(request)
+            if decision is not None:
+                return decision
+            return await self._prompt_user_consent(request)
+    
+    def _automatic_decision(self, request: ConsentRequest) -> Optional[ConsentDecision]:
+        """Decision that needs no prompt (global, session or auto-approval), else None"""
+        decision = self._remembered_decision(request)
+        if decision is not None:
+            return decision
+        return self._risk_decision(request)
+    
+    def _remembered_decision(self, request: ConsentRequest) -> Optional[ConsentDecision]:
+        """Decision from an earlier global or session answer, else None"""
+        
         # Check global decisions
         if self.global_allow_all:
             logger.info(f"Auto-approved (global): {request}")
@@ -181,6 +255,11 @@ class ConsentManager:
             logger.info(f"Auto-denied (session): {request}")
             return ConsentDecision.DENY
         
+        return None
+    
+    def _risk_decision(self, request: ConsentRequest) -> Optional[ConsentDecision]:
+        """Decision from the assessed risk level and mode, else None"""
+        
         # Non-interactive mode - check auto-approval first
         if not self.interactive:
             # Auto-approve safe operations if enabled
@@ -196,40 +275,28 @@ class ConsentManager:
             logger.info(f"Auto-approved (safe): {request}")
             return ConsentDecision.ALLOW
         
-        # Interactive consent prompt
-        return self._prompt_user_consent(request)
+        return None
     
-    def _prompt_user_consent(self, request: ConsentRequest) -> ConsentDecision:
-        """Prompt user for consent interactively"""
-        
-        # Display consent request
-        print("\n" + "="*60)
-        print("🔐 AGENT CONSENT REQUEST")
-        print("="*60)
-        print(f"Operation: {request.operation}")
-        print(f"Target: {request.target}")
-        print(f"Risk Level: {request.risk_level.upper()}")
-        
+    async def _prompt_user_consent(self, request: ConsentRequest) -> ConsentDecision:
+        """Prompt user for consent interactively, reading the answer off the event loop"""
+        
+        # Display consent request in a single write
+        lines = [
+            _CONSENT_HEADER,
+            f"Operation: {request.operation}",
+            f"Target: {request.target}",
+            f"Risk Level: {request.risk_level.upper()}",
+        ]
         if request.details:
-            print("Details:")
-            for key, value in request.details.items():
-                print(f"  {key}: {value}")
-        
-        print("\nThe agent wants to perform this operation.")
-        print("What would you like to do?")
-        print()
-        print("Options:")
-        print("  [a] Allow this operation")
-        print("  [d] Deny this operation") 
-        print("  [A] Allow ALL operations (session)")
-        print("  [D] Deny ALL operations (session)")
-        print("  [s] Allow this operation type for this session")
-        print("  [?] Show more details")
-        print()
+            lines.append("Details:")
+            lines.extend(f"  {key}: {value}" for key, value in request.details.items())
+        lines.append(_CONSENT_MENU)
+        sys.stdout.write("\n".join(lines))
+        sys.stdout.flush()
         
         while True:
             try:
-                choice = input("Your choice [a/d/A/D/s/?]: ").strip().lower()
+                choice = (await _run_blocking(input, "Your choice [a/d/A/D/s/?]: ")).strip()
                 
                 if choice == 'a':
                     print("✅ Operation APPROVED")
@@ -296,16 +363,18 @@ class ConsentManager:
         
         print(f"File Operation: {operation.upper()}")
         print(f"Target Path: {target_path}")
-        print(f"Absolute Path: {target_path.resolve()}")
+        print(f"Absolute Path: {self._realpath(os.path.join(os.getcwd(), request.target))}")
         print(f"Directory: {target_path.parent}")
         print(f"Safe Directory: {'Yes' if self.is_safe_directory(str(target_path)) else 'No'}")
         
-        if target_path.exists():
-            print(f"File Exists: Yes")
-            if target_path.is_file():
-                print(f"File Size: {target_path.stat().st_size} bytes")
-        else:
+        try:
+            st = target_path.stat()
+        except (OSError, ValueError):
             print(f"File Exists: No")
+        else:
+            print(f"File Exists: Yes")
+            if stat.S_ISREG(st.st_mode):
+                print(f"File Size: {st.st_size} bytes")
         
         if operation == "write" and "content" in request.details:
             content = request.details["content"]
@@ -359,12 +428,46 @@ class ConsentManager:
         logger.info("Session permissions reset")
 
 
+async def _run_blocking(fn, *args):
+    """Run a blocking call (reading a prompt answer) in a daemon thread and await its result
+    
+    Unlike asyncio.to_thread, a prompt still waiting for input does not keep the
+    interpreter from exiting when the user interrupts the run.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
+    
+    def target():
+        try:
+            outcome = (future.set_result, fn(*args))
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        try:
+            loop.call_soon_threadsafe(deliver, *outcome)
+        except RuntimeError:
+            pass  # the loop has closed; nobody is waiting for the answer
+    
+    threading.Thread(target=target, name="consent-prompt", daemon=True).start()
+    return await future
+
+
+# Consent manager set for the current context (an agent run and the tasks it
+# starts); contexts that never set one share the global instance
+_consent_manager_var: ContextVar[Optional[ConsentManager]] = ContextVar("consent_manager", default=None)
+
 # Global consent manager instance
 _consent_manager: Optional[ConsentManager] = None
 
 
 def get_consent_manager() -> ConsentManager:
-    """Get the global consent manager instance"""
+    """Get the consent manager for the current context, else the global instance"""
+    manager = _consent_manager_var.get()
+    if manager is not None:
+        return manager
     global _consent_manager
     if _consent_manager is None:
         _consent_manager = ConsentManager()
@@ -372,9 +475,12 @@ def get_consent_manager() -> ConsentManager:
 
 
 def set_consent_manager(manager: ConsentManager):
-    """Set the global consent manager instance"""
-    global _consent_manager
-    _consent_manager = manager
+    """Set the consent manager for the current context
+    
+    Tasks started from this context afterwards use it too, so agents running
+    concurrently in their own tasks each keep their own consent state.
+    """
+    _consent_manager_var.set(manager)
 
 
 async def request_operation_consent(
@@ -1,97 +1,140 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
 from typing import Dict, Any, Literal, Optional, List
+from functools import lru_cache
+import json
+import os
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the calls in one tool_batch action
+MAX_BATCH_CALLS = 8
+
 class Action(BaseModel):
-    type: Literal['tool', 'think', 'finish']
+    type: Literal['tool', 'tool_batch', 'think', 'finish']
     name: Optional[str] = None
     args: Dict[str, Any] = Field(default_factory=dict)
     output: Optional[str] = None
     reasoning: Optional[str] = None  # Added missing reasoning field for think actions
+    calls: Optional[List[Dict[str, Any]]] = Field(default=None, validate_default=True)  # independent {name, args} calls of a tool_batch
     
-    @validator('name')
-    def validate_tool_name(cls, v, values):
-        if values.get('type') == 'tool' and not v:
+    @field_validator('name')
+    @classmethod
+    def validate_tool_name(cls, v, info: ValidationInfo):
+        if info.data.get('type') == 'tool' and not v:
             raise ValueError("Tool name is required for tool actions")
         return v
     
-    @validator('args')
-    def validate_args(cls, v, values):
-        if values.get('type') == 'tool':
+    @field_validator('args')
+    @classmethod
+    def validate_args(cls, v, info: ValidationInfo):
+        if info.data.get('type') == 'tool':
             # Basic validation for tool arguments
             if not isinstance(v, dict):
                 raise ValueError("Tool args must be a dictionary")
         return v
+    
+    @field_validator('calls')
+    @classmethod
+    def validate_calls(cls, v, info: ValidationInfo):
+        if info.data.get('type') == 'tool_batch':
+            if not v:
+                raise ValueError("Tool batch requires at least one call")
+            if len(v) > MAX_BATCH_CALLS:
+                raise ValueError(f"Tool batch has {len(v)} calls, the limit is {MAX_BATCH_CALLS}")
+            for call in v:
+                if not call.get('name'):
+                    raise ValueError("Tool name is required for each batch call")
+                if not isinstance(call.get('args', {}), dict):
+                    raise ValueError("Tool args must be a dictionary")
+        return v
+
+
+def _fuse(patterns, flags=0) -> "re.Pattern":
+    """Compile patterns into one alternation whose branch i is the group named p<i>
+    
+    The input is scanned once for all patterns; _branch tells which one matched.
+    """
+    return re.compile("|".join(f"(?P<p{i}>{p})" for i, p in enumerate(patterns)), flags)
+
+
+def _branch(patterns, match: "re.Match") -> str:
+    """The pattern in patterns whose branch of their _fuse alternation matched"""
+    return patterns[int(match.lastgroup[1:])]
+
+
+# Command fragments that are rejected outright
+_BLOCKED_PATTERNS = (
+    r'rm\s+-rf\s+/',
+    r'sudo\s+rm',
+    r'mkfs',
+    r'dd\s+if=',
+    r'chmod\s+777',
+    r'passwd\s+',
+    r'useradd\s+',
+    r'userdel\s+',
+    r'mount\s+',
+    r'umount\s+',
+    r'systemctl\s+',
+    r'service\s+',
+    r'iptables\s+',
+    r'ufw\s+',
+)
+_BLOCKED_RE = _fuse(_BLOCKED_PATTERNS, re.IGNORECASE)
+
+# Command fragments that are logged but allowed
+_SUSPICIOUS_PATTERNS = (
+    r'eval\s*\(',
+    r'exec\s*\(',
+    r'__import__\s*\(',
+    r'subprocess\.call',
+    r'os\.system',
+    r'base64\.decode',
+    r'pickle\.loads',
+)
+_SUSPICIOUS_RE = _fuse(_SUSPICIOUS_PATTERNS, re.IGNORECASE)
+
+# Imports and calls logged when found in code, matched as plain substrings
+_DANGEROUS_CODE_RE = re.compile("|".join(re.escape(danger) for danger in (
+    'import os', 'import subprocess', 'import sys',
+    'from os import', 'from subprocess import',
+    '__import__', 'eval(', 'exec('
+)), re.IGNORECASE)
+
+# File operations under these directories are blocked
+_DANGEROUS_PATH_PREFIXES = (
+    '/etc/', '/usr/', '/bin/', '/sbin/', '/boot/',
+    '/dev/', '/proc/', '/sys/', '/root/'
+)
 
 
 class SafetyChecker:
     """Safety checker for agent actions and content"""
     
     def __init__(self):
-        self.blocked_patterns = [
-            r'rm\s+-rf\s+/',
-            r'sudo\s+rm',
-            r'mkfs',
-            r'dd\s+if=',
-            r'chmod\s+777',
-            r'passwd\s+',
-            r'useradd\s+',
-            r'userdel\s+',
-            r'mount\s+',
-            r'umount\s+',
-            r'systemctl\s+',
-            r'service\s+',
-            r'iptables\s+',
-            r'ufw\s+',
-        ]
-        
-        self.suspicious_patterns = [
-            r'eval\s*\(',
-            r'exec\s*\(',
-            r'__import__\s*\(',
-            r'subprocess\.call',
-            r'os\.system',
-            r'base64\.decode',
-            r'pickle\.loads',
-        ]
-        
         self.max_output_length = 10000
         self.max_file_size_mb = 100
     
     def check_command_safety(self, command: str) -> bool:
         """Check if a command is safe to execute"""
-        command_lower = command.lower().strip()
-        
         # Check for blocked patterns
-        for pattern in self.blocked_patterns:
-            if re.search(pattern, command_lower):
-                logger.warning(f"Blocked command pattern detected: {pattern}")
-                return False
+        match = _BLOCKED_RE.search(command)
+        if match:
+            logger.warning(f"Blocked command pattern detected: {_branch(_BLOCKED_PATTERNS, match)}")
+            return False
         
         # Check for suspicious patterns
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, command_lower):
-                logger.warning(f"Suspicious command pattern detected: {pattern}")
+        for pattern in {_branch(_SUSPICIOUS_PATTERNS, m) for m in _SUSPICIOUS_RE.finditer(command)}:
+            logger.warning(f"Suspicious command pattern detected: {pattern}")
         
         return True
     
     def check_code_safety(self, code: str) -> bool:
         """Check if code is safe to execute"""
-        code_lower = code.lower()
-        
         # Check for dangerous imports/functions
-        dangerous_imports = [
-            'import os', 'import subprocess', 'import sys',
-            'from os import', 'from subprocess import',
-            '__import__', 'eval(', 'exec('
-        ]
-        
-        for danger in dangerous_imports:
-            if danger in code_lower:
-                logger.warning(f"Potentially dangerous code detected: {danger}")
+        for danger in {m.group(0).lower() for m in _DANGEROUS_CODE_RE.finditer(code)}:
+            logger.warning(f"Potentially dangerous code detected: {danger}")
         
         return True
     
@@ -107,67 +150,72 @@ class SafetyChecker:
     
     def check_file_operation_safety(self, file_path: str, operation: str) -> bool:
         """Check if file operation is safe"""
-        import os
-        from pathlib import Path
-        
-        path = Path(file_path).resolve()
+        path = os.path.realpath(file_path)
         
         # Check for dangerous paths
-        dangerous_paths = [
-            '/etc/', '/usr/', '/bin/', '/sbin/', '/boot/',
-            '/dev/', '/proc/', '/sys/', '/root/'
-        ]
-        
-        for dangerous in dangerous_paths:
-            if str(path).startswith(dangerous):
-                logger.warning(f"Blocked file operation on dangerous path: {path}")
-                return False
+        if path.startswith(_DANGEROUS_PATH_PREFIXES):
+            logger.warning(f"Blocked file operation on dangerous path: {path}")
+            return False
         
         # Check file size for write operations
-        if operation in ['write', 'create'] and path.exists():
+        if operation in ['write', 'create']:
             try:
-                size_mb = path.stat().st_size / (1024 * 1024)
+                size_mb = os.stat(path).st_size / (1024 * 1024)
                 if size_mb > self.max_file_size_mb:
                     logger.warning(f"File too large: {size_mb}MB > {self.max_file_size_mb}MB")
                     return False
             except:
-                pass
+                pass  # does not exist yet
         
         return True
 
 
+# Secrets masked in agent output
+_SENSITIVE_PATTERNS = (
+    r'[A-Za-z0-9+/]{40,}={0,2}',  # Base64 encoded data
+    r'sk-[a-zA-Z0-9]{48}',  # OpenAI API keys
+    r'ghp_[a-zA-Z0-9]{36}',  # GitHub personal access tokens
+    r'AIza[0-9A-Za-z-_]{35}',  # Google API keys
+    r'AKIA[0-9A-Z]{16}',  # AWS access keys
+    r'(?i:password\s*[:=]\s*["\']?[^\s"\']+)',  # Passwords
+    r'(?i:secret\s*[:=]\s*["\']?[^\s"\']+)',  # Secrets
+)
+_SENSITIVE_RE = _fuse(_SENSITIVE_PATTERNS)
+
+
 class ContentFilter:
     """Filter for sensitive content in agent communications"""
     
-    def __init__(self):
-        self.sensitive_patterns = [
-            r'[A-Za-z0-9+/]{40,}={0,2}',  # Base64 encoded data
-            r'sk-[a-zA-Z0-9]{48}',  # OpenAI API keys
-            r'ghp_[a-zA-Z0-9]{36}',  # GitHub personal access tokens
-            r'AIza[0-9A-Za-z-_]{35}',  # Google API keys
-            r'AKIA[0-9A-Z]{16}',  # AWS access keys
-            r'(?i)password\s*[:=]\s*["\']?[^\s"\']+',  # Passwords
-            r'(?i)secret\s*[:=]\s*["\']?[^\s"\']+',  # Secrets
-        ]
-    
     def filter_sensitive_content(self, text: str) -> str:
         """Remove or mask sensitive content"""
         if not isinstance(text, str):
             return text
         
-        filtered_text = text
+        masked = {}  # patterns that matched, in first-match order
         
-        for pattern in self.sensitive_patterns:
-            matches = re.finditer(pattern, filtered_text)
-            for match in matches:
-                # Replace with masked version
-                masked = '*' * len(match.group())
-                filtered_text = filtered_text.replace(match.group(), masked)
-                logger.warning(f"Masked sensitive content: {pattern}")
+        def mask(match: "re.Match") -> str:
+            # Replace exactly the matched span with a masked version
+            masked[_branch(_SENSITIVE_PATTERNS, match)] = None
+            return '*' * (match.end() - match.start())
+        
+        filtered_text = _SENSITIVE_RE.sub(mask, text)
+        for pattern in masked:
+            logger.warning(f"Masked sensitive content: {pattern}")
         
         return filtered_text
 
 
+# Injection attempts rejected in user input
+_INJECTION_PATTERNS = (
+    r'<script.*?>',
+    r'javascript:',
+    r'data:text/html',
+    r'eval\s*\(',
+    r'exec\s*\(',
+)
+_INJECTION_RE = _fuse(_INJECTION_PATTERNS, re.IGNORECASE)
+
+
 class InputValidator:
     """Validator for user inputs and tool arguments"""
     
@@ -185,18 +233,10 @@ class InputValidator:
             return False
         
         # Check for injection attempts
-        injection_patterns = [
-            r'<script.*?>',
-            r'javascript:',
-            r'data:text/html',
-            r'eval\s*\(',
-            r'exec\s*\(',
-        ]
-        
-        for pattern in injection_patterns:
-            if re.search(pattern, user_input, re.IGNORECASE):
-                logger.warning(f"Potential injection detected: {pattern}")
-                return False
+        match = _INJECTION_RE.search(user_input)
+        if match:
+            logger.warning(f"Potential injection detected: {_branch(_INJECTION_PATTERNS, match)}")
+            return False
         
         return True
     
@@ -224,38 +264,94 @@ content_filter = ContentFilter()
 input_validator = InputValidator()
 
 
+# Tools whose command or code is checked (and suspicious parts logged) on every call
+_CHECKED_TOOLS = frozenset({'shell.exec', 'code.python'})
+
+
+def _check_tool_call(name: Optional[str], args: Dict[str, Any]):
+    """Run the safety checks for one tool call, raising ValueError on failure"""
+    # Validate tool arguments
+    if not input_validator.validate_tool_args(args):
+        raise ValueError("Tool arguments failed validation")
+    
+    # Check for dangerous operations
+    if name in _CHECKED_TOOLS:
+        if 'command' in args:
+            if not safety_checker.check_command_safety(args['command']):
+                raise ValueError("Command failed safety check")
+        if 'code' in args:
+            if not safety_checker.check_code_safety(args['code']):
+                raise ValueError("Code failed safety check")
+    
+    if name and 'file.' in name:
+        if 'path' in args:
+            operation = name.split('.')[-1]
+            if not safety_checker.check_file_operation_safety(args['path'], operation):
+                raise ValueError("File operation failed safety check")
+
+
 def validate_action(action: Dict[str, Any]) -> Dict[str, Any]:
-    """Validate and sanitize an action"""
+    """Validate and sanitize an action
+    
+    Results are cached by the action's canonical JSON, so revalidating an
+    identical action (retries, replayed plans) is a lookup. Each call returns
+    a fresh dict. Actions calling file, shell or code tools are always checked
+    again: their checks depend on the filesystem or log warnings per call.
+    """
+    if not _is_cacheable(action):
+        return _validate_action(action)
+    try:
+        canonical = json.dumps(action, sort_keys=True)
+    except (TypeError, ValueError):  # not plain JSON data, validate uncached
+        return _validate_action(action)
+    try:
+        return json.loads(_validate_canonical(canonical))
+    except TypeError:  # a result that is not plain JSON data, validate uncached
+        return _validate_action(action)
+
+
+def _is_cacheable(action: Dict[str, Any]) -> bool:
+    """Whether every safety check for action depends on the action alone"""
+    names = [action.get('name')]
+    calls = action.get('calls')
+    if isinstance(calls, list):
+        names.extend(call.get('name') if isinstance(call, dict) else None for call in calls)
+    for name in names:
+        if name is not None and not isinstance(name, str):
+            return False
+        if name and ('file.' in name or name in _CHECKED_TOOLS):
+            return False
+    return True
+
+
+@lru_cache(maxsize=2048)
+def _validate_canonical(canonical: str) -> str:
+    """_validate_action for an action given as canonical JSON, returned as JSON
+    
+    Uses the standard library, which round-trips every int exactly.
+    """
+    return json.dumps(_validate_action(json.loads(canonical)))
+
+
+def _validate_action(action: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and sanitize an action, raising ValueError if it fails"""
     try:
         # Parse with Pydantic for basic validation
-        action_obj = Action(**action)
+        action_obj = Action.model_validate(action)
         
         # Additional safety checks
         if action_obj.type == 'tool':
-            # Validate tool arguments
-            if not input_validator.validate_tool_args(action_obj.args):
-                raise ValueError("Tool arguments failed validation")
-            
-            # Check for dangerous operations
-            if action_obj.name in ['shell.exec', 'code.python']:
-                if 'command' in action_obj.args:
-                    if not safety_checker.check_command_safety(action_obj.args['command']):
-                        raise ValueError("Command failed safety check")
-                if 'code' in action_obj.args:
-                    if not safety_checker.check_code_safety(action_obj.args['code']):
-                        raise ValueError("Code failed safety check")
-            
-            if action_obj.name and 'file.' in action_obj.name:
-                if 'path' in action_obj.args:
-                    operation = action_obj.name.split('.')[-1]
-                    if not safety_checker.check_file_operation_safety(action_obj.args['path'], operation):
-                        raise ValueError("File operation failed safety check")
+            _check_tool_call(action_obj.name, action_obj.args)
+        elif action_obj.type == 'tool_batch':
+            for call in action_obj.calls:
+                call.setdefault('args', {})
+                _check_tool_call(call['name'], call['args'])
         
         # Filter sensitive content in output
         if action_obj.output:
             action_obj.output = content_filter.filter_sensitive_content(action_obj.output)
         
-        return action_obj.dict()
+        return action_obj.model_dump()
         
     except Exception as e:
         logger.error(f"Action validation failed: {e}")
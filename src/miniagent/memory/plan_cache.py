@@ -0,0 +1,184 @@
+import re
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional, Callable
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Values in a goal that a replayed plan may need to change: quoted strings,
+# paths, file names and numbers. Tool args are stored with these replaced by
+# $0, $1, ... placeholders and rebound from the new goal on replay.
+_SLOT_RE = re.compile(
+    r"\"([^\"]+)\"|'([^']+)'"
+    r"|((?:[\w.~-]*/)+[\w.-]+|\b[\w-]+\.[A-Za-z0-9]{1,5}\b|\b\d+(?:\.\d+)?\b)"
+)
+_PLACEHOLDER_RE = re.compile(r"\$(\d+)")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Tool args holding free text, where only non-numeric goal values are templated
+_FREE_TEXT_ARGS = frozenset({"content", "text", "code"})
+
+
+def _goal_slots(goal: str) -> List[str]:
+    """Extract the rebindable values from a goal, in order of appearance"""
+    return [next(g for g in match.groups() if g) for match in _SLOT_RE.finditer(goal)]
+
+
+def _map_strings(value: Any, fn: Callable[[str], str]) -> Any:
+    """Apply fn to every string inside nested dicts and lists"""
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {k: _map_strings(v, fn) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(v, fn) for v in value]
+    return value
+
+
+def _substituter(slots: Dict[str, int]) -> Callable[[str], str]:
+    """Replace each slot value with its $N placeholder, and $ with $$, in one pass"""
+    # Longest first so "data.txt" is not split by a shorter slot like "data"
+    alternatives = [re.escape(slot) for slot in sorted(slots, key=len, reverse=True)]
+    pattern = re.compile("|".join(alternatives + [r"\$"]))
+
+    def replace(match):
+        text = match.group(0)
+        return f"${slots[text]}" if text in slots else "$$"  # keep literal dollars distinguishable
+
+    return lambda text: pattern.sub(replace, text)
+
+
+def _template_args(args: Dict[str, Any], goal: str) -> Dict[str, Any]:
+    """Replace goal values that appear in tool args with $N placeholders
+    
+    Free-text args (file content, code) keep their numbers: a "3" in the goal
+    is rarely the 3 in the text.
+    """
+    slots = {}
+    for index, slot in enumerate(_goal_slots(goal)):
+        slots.setdefault(slot, index)
+    substitute = _substituter(slots)
+    substitute_text = _substituter({slot: index for slot, index in slots.items()
+                                    if not _NUMBER_RE.fullmatch(slot)})
+    return {
+        key: _map_strings(value, substitute_text if key in _FREE_TEXT_ARGS else substitute)
+        for key, value in args.items()
+    }
+
+
+def _rebind_args(template: Dict[str, Any], goal: str) -> Optional[Dict[str, Any]]:
+    """Fill a templated args dict with values from goal (None if goal lacks a value)"""
+    slots = _goal_slots(goal)
+    missing = False
+
+    def fill(text: str) -> str:
+        def replace(match):
+            nonlocal missing
+            index = int(match.group(1))
+            if index >= len(slots):
+                missing = True
+                return match.group(0)
+            return slots[index]
+
+        parts = text.split("$$")
+        return "$".join(_PLACEHOLDER_RE.sub(replace, part) for part in parts)
+
+    args = _map_strings(template, fill)
+    return None if missing else args
+
+
+def tools_signature(tool_names: List[str]) -> str:
+    """Stable digest of the tool set a plan was made with"""
+    return hashlib.blake2b("\n".join(sorted(tool_names)).encode(), digest_size=16).hexdigest()
+
+
+class PlanCache:
+    """Tool-call plans of finished goals, looked up by goal embedding similarity
+
+    Plans are only reused for the same tool set. Entries are kept in a JSON file
+    next to the other persisted memories; the oldest are dropped past max_entries.
+    """
+
+    def __init__(self, path: Path, encode: Callable[[str], Any],
+                 threshold: float = 0.90, max_entries: int = 256):
+        self.path = Path(path)
+        self.encode = encode
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: Optional[List[Dict[str, Any]]] = None
+        self._matrix: Optional[np.ndarray] = None
+
+    def _embed(self, goal: str) -> np.ndarray:
+        vector = np.asarray(self.encode(goal), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = []
+            if self.path.exists():
+                try:
+                    self._entries = json.loads(self.path.read_text())
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Ignoring unreadable plan cache {self.path}: {e}")
+        return self._entries
+
+    def _embeddings(self) -> np.ndarray:
+        if self._matrix is None:
+            entries = self._load()
+            self._matrix = np.asarray([e["embedding"] for e in entries], dtype=np.float32)
+        return self._matrix
+
+    def lookup(self, goal: str, tools_hash: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached tool actions for a goal similar to this one, rebound to it"""
+        entries = self._load()
+        if not entries:
+            return None
+
+        similarities = self._embeddings() @ self._embed(goal)
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.threshold:
+                break
+            entry = entries[index]
+            if entry["tools_hash"] != tools_hash or entry["slots"] != len(_goal_slots(goal)):
+                continue
+            actions = []
+            for template in entry["actions"]:
+                args = _rebind_args(template["args"], goal)
+                if args is None:
+                    break
+                actions.append({"type": "tool", "name": template["name"], "args": args})
+            else:
+                logger.info(f"Plan cache hit ({similarities[index]:.2f}): {entry['goal'][:50]}")
+                return actions
+        return None
+
+    def store(self, goal: str, tools_hash: str, actions: List[Dict[str, Any]]):
+        """Remember the tool actions that completed goal"""
+        if not actions:
+            return
+        entries = self._load()
+        entries.append({
+            "goal": goal,
+            "tools_hash": tools_hash,
+            "embedding": self._embed(goal).tolist(),
+            "slots": len(_goal_slots(goal)),
+            "actions": [
+                {"name": a["name"], "args": _template_args(a.get("args", {}), goal)}
+                for a in actions
+            ],
+            "timestamp": time.time(),
+        })
+        del entries[:-self.max_entries]
+        self._matrix = None
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(entries))
+        except OSError as e:
+            logger.debug(f"Could not write plan cache {self.path}: {e}")
@@ -1,13 +1,44 @@
 import os
-import json
 import uuid
-from typing import Dict, List, Any, Optional
+import asyncio
+import functools
+import importlib.util
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
+from .. import _json
+from .plan_cache import PlanCache
+
+
+# VectorMemoryStore.submit batches contents submitted within this many
+# seconds of each other, up to this many per batch
+SUBMIT_WINDOW_S = 0.005
+SUBMIT_BATCH = 64
+
+# Episodic memory log in memory_dir, one JSON episode per line
+_EPISODIC_FILE = "episodic.ndjson"
+_LEGACY_EPISODIC_FILE = "episodic.json"
+
+
+def _load_encoder(model_name: str) -> SentenceTransformer:
+    """Load a sentence encoder, on ONNX Runtime when it is installed
+    
+    sentence-transformers 3.2+ can run the model as a fused ONNX graph (the
+    "onnx" extra); older versions, or a model that fails to load that way,
+    fall back to PyTorch. Embeddings are the same either way.
+    """
+    if importlib.util.find_spec("onnxruntime") is not None:
+        try:
+            return SentenceTransformer(model_name, backend="onnx")
+        except Exception:  # optional speedup, see the "onnx" extra
+            pass
+    return SentenceTransformer(model_name)
+
 
 @dataclass
 class MemoryItem:
@@ -43,30 +74,105 @@ class VectorMemoryStore:
             )
         
         # Initialize sentence transformer for embeddings
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.encoder = _load_encoder('all-MiniLM-L6-v2')
+        # Agents recall with the same queries across steps, so each query
+        # string is embedded only once
+        self._query_embedding = functools.lru_cache(maxsize=1024)(self._embed_query)
+        
+        # Contents passed to submit and not yet added: (content, metadata, future)
+        self._submissions: List[Tuple[str, Dict[str, Any], "asyncio.Future"]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batches: Set["asyncio.Task"] = set()  # running _add_batch tasks
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches as float32 vectors of unit length
+        
+        Unit length matches the collection's cosine space. Embeddings stay
+        float32: ChromaDB's index stores float32 either way, so rounding them
+        to float16 or int8 first would only lose precision.
+        """
+        return self.encoder.encode(
+            texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        ).tolist()
+    
+    def _embed_query(self, query: str) -> List[float]:
+        """Embedding of a single search query"""
+        return self._embed([query])[0]
     
     def add(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """Add content to memory store"""
-        memory_id = str(uuid.uuid4())
-        metadata = metadata or {}
+        return self.add_many([content], [metadata or {}])[0]
+    
+    def add_many(self, contents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """Add several contents to memory store, embedding them in one batch"""
+        if not contents:
+            return []
+        metadatas = metadatas or [{} for _ in contents]
+        memory_ids = [str(uuid.uuid4()) for _ in contents]
         
-        # Generate embedding
-        embedding = self.encoder.encode(content).tolist()
+        # Generate embeddings in a single encoder call
+        embeddings = self._embed(contents)
         
         # Add to ChromaDB
         self.collection.add(
-            ids=[memory_id],
-            documents=[content],
-            metadatas=[metadata],
-            embeddings=[embedding]
+            ids=memory_ids,
+            documents=contents,
+            metadatas=metadatas,
+            embeddings=embeddings
         )
         
-        return memory_id
+        return memory_ids
+    
+    async def submit(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Add content from async code, batched with other concurrent submissions
+        
+        Contents submitted within SUBMIT_WINDOW_S of the first one (at most
+        SUBMIT_BATCH of them) are added by one add_many call, run in a worker
+        thread so the event loop keeps running while they are embedded.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._submissions.append((content, metadata or {}, future))
+        if len(self._submissions) >= SUBMIT_BATCH:
+            self._flush_submissions()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(SUBMIT_WINDOW_S, self._flush_submissions)
+        return await future
+    
+    def _flush_submissions(self):
+        """Start adding the pending submissions as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._submissions = self._submissions, []
+        if batch:
+            task = asyncio.ensure_future(self._add_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _add_batch(self, batch: List[Tuple[str, Dict[str, Any], "asyncio.Future"]]):
+        """add_many the batch in a worker thread and resolve each submitter's future"""
+        try:
+            memory_ids = await asyncio.to_thread(
+                self.add_many, [content for content, _, _ in batch], [metadata for _, metadata, _ in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), memory_id in zip(batch, memory_ids):
+                if not future.done():
+                    future.set_result(memory_id)
+    
+    async def search_async(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """search run in a worker thread, so the event loop keeps running while the query is embedded"""
+        return await asyncio.to_thread(self.search, query, top_k)
     
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for similar memories"""
         # Generate query embedding
-        query_embedding = self.encoder.encode(query).tolist()
+        query_embedding = self._query_embedding(query)
         
         # Search in ChromaDB
         results = self.collection.query(
@@ -124,6 +230,9 @@ class EpisodicMemory:
     def __init__(self, max_episodes: int = 1000):
         self.episodes: List[Dict[str, Any]] = []
         self.max_episodes = max_episodes
+        # Lowercased text of each episode's content by episode id, filled in
+        # as episodes are added or first searched
+        self._search_text: Dict[str, str] = {}
     
     def add_episode(self, content: Dict[str, Any]):
         """Add an episode to memory"""
@@ -133,9 +242,12 @@ class EpisodicMemory:
             'content': content
         }
         self.episodes.append(episode)
+        self._search_text[episode['id']] = str(content).lower()
         
         # Keep only recent episodes
         if len(self.episodes) > self.max_episodes:
+            for dropped in self.episodes[:-self.max_episodes]:
+                self._search_text.pop(dropped['id'], None)
             self.episodes = self.episodes[-self.max_episodes:]
     
     def get_recent(self, count: int = 10) -> List[Dict[str, Any]]:
@@ -150,9 +262,12 @@ class EpisodicMemory:
     def search(self, query: str) -> List[Dict[str, Any]]:
         """Simple text search in episodes"""
         query_lower = query.lower()
+        search_text = self._search_text
         matches = []
         for episode in self.episodes:
-            content_str = str(episode['content']).lower()
+            content_str = search_text.get(episode['id'])
+            if content_str is None:  # loaded from disk, not searched yet
+                content_str = search_text[episode['id']] = str(episode['content']).lower()
             if query_lower in content_str:
                 matches.append(episode)
         return matches
@@ -162,36 +277,32 @@ class WorkingMemory:
     """Short-term working memory for current context"""
     
     def __init__(self, max_items: int = 20):
-        self.items: Dict[str, Any] = {}
+        # Least recently used first
+        self.items: "OrderedDict[str, Any]" = OrderedDict()
         self.max_items = max_items
-        self.access_order: List[str] = []
     
     def set(self, key: str, value: Any):
         """Set a value in working memory"""
         if key in self.items:
             # Move to end if already exists
-            self.access_order.remove(key)
+            self.items.move_to_end(key)
         elif len(self.items) >= self.max_items:
             # Remove least recently used
-            lru_key = self.access_order.pop(0)
-            del self.items[lru_key]
+            self.items.popitem(last=False)
         
         self.items[key] = value
-        self.access_order.append(key)
     
     def get(self, key: str, default=None):
         """Get a value from working memory"""
         if key in self.items:
             # Update access order
-            self.access_order.remove(key)
-            self.access_order.append(key)
+            self.items.move_to_end(key)
             return self.items[key]
         return default
     
     def clear(self):
         """Clear working memory"""
         self.items.clear()
-        self.access_order.clear()
     
     def keys(self) -> List[str]:
         """Get all keys"""
@@ -212,6 +323,7 @@ class IntegratedMemorySystem:
         )
         self.episodic = EpisodicMemory()
         self.working = WorkingMemory()
+        self.plan_cache = PlanCache(self.memory_dir / "plan_cache.json", self.vector_store.encoder.encode)
         
         # Load episodic memory if exists
         self._load_episodic()
@@ -231,6 +343,38 @@ class IntegratedMemorySystem:
             self.working.set(key, content)
             return key
     
+    def remember_many(self, entries: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[Any]:
+        """Store several (content, memory_type, metadata) entries at once
+        
+        Semantic entries are embedded in one batch and episodic memory is saved
+        to disk once, instead of once per entry. Returns what remember would
+        have returned for each entry, in order.
+        """
+        results = [None] * len(entries)
+        semantic = []
+        episodic_count = 0
+        
+        for i, (content, memory_type, metadata) in enumerate(entries):
+            metadata = metadata or {}
+            metadata['type'] = memory_type
+            
+            if memory_type == "semantic":
+                semantic.append((i, content, metadata))
+            elif memory_type == "episodic":
+                self.episodic.add_episode({'content': content, 'metadata': metadata})
+                episodic_count += 1
+            elif memory_type == "working":
+                results[i] = self.remember(content, memory_type, metadata)
+        
+        if semantic:
+            memory_ids = self.vector_store.add_many([c for _, c, _ in semantic], [m for _, _, m in semantic])
+            for (i, _, _), memory_id in zip(semantic, memory_ids):
+                results[i] = memory_id
+        if episodic_count:
+            self._save_episodic(episodic_count)
+        
+        return results
+    
     def recall(self, query: str, memory_type: str = "semantic", top_k: int = 5) -> List[Dict[str, Any]]:
         """Retrieve relevant memories"""
         if memory_type == "semantic":
@@ -251,18 +395,49 @@ class IntegratedMemorySystem:
         }
         return context
     
-    def _save_episodic(self):
-        """Save episodic memory to disk"""
-        episodic_file = self.memory_dir / "episodic.json"
-        with open(episodic_file, 'w') as f:
-            json.dump(self.episodic.episodes, f, indent=2)
+    def _save_episodic(self, count: int = 1):
+        """Append the last count episodes to the episodic log on disk
+        
+        The log holds one JSON object per line, so saving writes only the new
+        episodes. Once it has twice max_episodes lines it is rewritten with
+        just the retained episodes.
+        """
+        new_episodes = self.episodic.episodes[-count:]
+        if self._episodic_lines + len(new_episodes) > 2 * self.episodic.max_episodes:
+            self._rewrite_episodic()
+            return
+        with open(self.memory_dir / _EPISODIC_FILE, 'ab') as f:
+            f.write(b''.join(_json.dumps_bytes(ep) + b'\n' for ep in new_episodes))
+        self._episodic_lines += len(new_episodes)
+    
+    def _rewrite_episodic(self):
+        """Replace the episodic log with the episodes currently in memory"""
+        episodic_file = self.memory_dir / _EPISODIC_FILE
+        temp_file = episodic_file.with_suffix('.tmp')
+        with open(temp_file, 'wb') as f:
+            f.write(b''.join(_json.dumps_bytes(ep) + b'\n' for ep in self.episodic.episodes))
+        os.replace(temp_file, episodic_file)
+        self._episodic_lines = len(self.episodic.episodes)
     
     def _load_episodic(self):
         """Load episodic memory from disk"""
-        episodic_file = self.memory_dir / "episodic.json"
-        if episodic_file.exists():
-            try:
-                with open(episodic_file, 'r') as f:
-                    self.episodic.episodes = json.load(f)
-            except:
-                pass  # Continue with empty memory if loading fails
+        self._episodic_lines = 0
+        episodic_file = self.memory_dir / _EPISODIC_FILE
+        legacy_file = self.memory_dir / _LEGACY_EPISODIC_FILE
+        try:
+            if episodic_file.exists():
+                episodes = []
+                with open(episodic_file, 'rb') as f:
+                    for line in f:
+                        self._episodic_lines += 1
+                        try:
+                            episodes.append(_json.loads(line))
+                        except ValueError:
+                            pass  # e.g. a line cut short by a crash
+                self.episodic.episodes = episodes[-self.episodic.max_episodes:]
+            elif legacy_file.exists():
+                # Earlier versions kept one JSON list, rewritten on every save
+                self.episodic.episodes = _json.loads(legacy_file.read_bytes())
+                self._rewrite_episodic()
+        except:
+            pass  # Continue with empty memory if loading fails
@@ -1,14 +1,48 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import os
 import json
 from ..tools.registry import ToolSpec
 from ..config import get_config
+from .._text import truncated_str
 from .model_selector import select_model_for_question
 from openai import OpenAI
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _parse_arguments(tool_call) -> Dict[str, Any]:
+    """Decode a tool call's JSON arguments, falling back to no arguments"""
+    try:
+        args = json.loads(tool_call.function.arguments)
+        logger.info(f"Function: {tool_call.function.name}, Arguments: {args}")
+        return args
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error: {e}, Raw arguments: {tool_call.function.arguments}")
+        return {}
+
+# Function definitions for the last tool list planned with. run_agent passes the
+# same list object on every step of a run, so they are only built once per run.
+_function_cache: Tuple[Optional[List[ToolSpec]], List[Dict[str, Any]]] = (None, [])
+
+def _tool_functions(tools_available: List[ToolSpec]) -> List[Dict[str, Any]]:
+    """OpenAI function definitions for the given tools (a fresh list the caller may extend)"""
+    global _function_cache
+    cached_tools, functions = _function_cache
+    if cached_tools is not tools_available:
+        functions = [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name.replace(".", "_"),  # OpenAI doesn't like dots in function names
+                    "description": f"Tool: {tool.name}",
+                    "parameters": tool.schema
+                }
+            }
+            for tool in tools_available
+        ]
+        _function_cache = (tools_available, functions)
+    return list(functions)
+
 def plan_next(state, tools_available: List[ToolSpec]) -> Dict[str, Any]:
     """Universal LLM planner with dynamic model selection based on complexity"""
     config = get_config()
@@ -22,6 +56,9 @@ def plan_next(state, tools_available: List[ToolSpec]) -> Dict[str, Any]:
                 action = entry["action"]
                 if action.get('type') == 'tool':
                     context_parts.append(f"Used {action.get('name')} tool")
+                elif action.get('type') == 'tool_batch':
+                    names = ', '.join(call.get('name', '?') for call in action.get('calls') or [])
+                    context_parts.append(f"Used {names} tools")
                 elif action.get('type') == 'think':
                     context_parts.append("Performed thinking step")
         context = "; ".join(context_parts)
@@ -65,6 +102,11 @@ def plan_next(state, tools_available: List[ToolSpec]) -> Dict[str, Any]:
                 context += f"- Step {entry['step']}: {action.get('type', 'unknown')} action"
                 if action.get('type') == 'tool':
                     context += f" using {action.get('name')} with args {action.get('args', {})}"
+                elif action.get('type') == 'tool_batch':
+                    calls = action.get('calls') or []
+                    context += " using " + "; ".join(
+                        f"{call.get('name')} with args {call.get('args', {})}" for call in calls
+                    )
                 elif action.get('type') == 'think':
                     context += f": {action.get('reasoning', 'thinking...')}"
                 context += "\n"
@@ -72,6 +114,10 @@ def plan_next(state, tools_available: List[ToolSpec]) -> Dict[str, Any]:
                 # Clearly show that user denied the operation
                 operation = entry.get("operation", "unknown operation")
                 context += f"- Step {entry['step']}: USER DENIED operation '{operation}' - DO NOT retry this operation\n"
+            if "observations" in entry:
+                # Results of a parallel tool batch, in call order
+                for i, obs in enumerate(entry["observations"]):
+                    context += f"  Result {i+1}: {truncated_str(obs, 200)}\n"
             if "observation" in entry:
                 obs = entry["observation"]
                 # For weather/stock tools, include full response to avoid loops
@@ -96,21 +142,11 @@ def plan_next(state, tools_available: List[ToolSpec]) -> Dict[str, Any]:
                     result_text += " [IMPORTANT: Use this search information to provide a comprehensive answer with the 'finish' function. Do not search again.]"
                     context += f"  Result: {result_text}\n"
                 else:
-                    obs_str = str(obs)[:200]  # Truncate other long observations
+                    obs_str = truncated_str(obs, 200)  # Truncate other long observations
                     context += f"  Result: {obs_str}\n"
     
     # Convert tools to OpenAI function format
-    tool_functions = []
-    for tool in tools_available:
-        function_def = {
-            "type": "function",
-            "function": {
-                "name": tool.name.replace(".", "_"),  # OpenAI doesn't like dots in function names
-                "description": f"Tool: {tool.name}",
-                "parameters": tool.schema
-            }
-        }
-        tool_functions.append(function_def)
+    tool_functions = _tool_functions(tools_available)
     
     # Debug logging for tools
     logger.info(f"Available tools: {[t.name for t in tools_available]}")
@@ -164,6 +200,7 @@ INSTRUCTIONS:
 - For STOCK PRICE queries, use stock.info tool ONCE, then immediately finish with the guidance provided
 - For DATE/TIME queries ("what is the date today?", "what time is it?"), use shell.exec tool with command "date" to get current information
 - For topics requiring CURRENT information or research, use web.search tool which provides comprehensive results
+- If you need several INDEPENDENT tool calls (e.g. reading 3 files), request them all in one response; they run in parallel
 - Use think only if you need to analyze a complex problem first
 - Use finish when you have the complete answer
 - PREFER direct answers over tool usage for basic facts, definitions, historical information, and general knowledge
@@ -234,15 +271,19 @@ Only use tools when you genuinely need current data, calculations, or file opera
         logger.info(f"LLM Response - Content: {message.content}")
         
         if message.tool_calls:
+            # Several plain tool calls in one response are independent: run them as a batch
+            if len(message.tool_calls) > 1 and not any(
+                tc.function.name in ("think", "finish") for tc in message.tool_calls
+            ):
+                calls = [
+                    {"name": tc.function.name.replace("_", "."), "args": _parse_arguments(tc)}
+                    for tc in message.tool_calls
+                ]
+                return {"type": "tool_batch", "calls": calls}
+            
             tool_call = message.tool_calls[0]
             function_name = tool_call.function.name
-            
-            try:
-                args = json.loads(tool_call.function.arguments)
-                logger.info(f"Function: {function_name}, Arguments: {args}")
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error: {e}, Raw arguments: {tool_call.function.arguments}")
-                args = {}
+            args = _parse_arguments(tool_call)
             
             if function_name == "think":
                 reasoning = args.get("reasoning", "")
@@ -1,6 +1,5 @@
 from dataclasses import dataclass
 from typing import Dict, Any, Callable, List, Optional
-from pydantic import BaseModel, ValidationError
 
 @dataclass
 class ToolSpec:
@@ -1,4 +1,6 @@
+import argparse
 import asyncio
+import json
 import pytest
 import tempfile
 import os
@@ -6,11 +8,15 @@ from pathlib import Path
 
 from miniagent.core.runtime import run_agent
 from miniagent.core.state import AgentState
-from miniagent.config import AgentConfig, set_config
+from miniagent import cli
+from miniagent import config as config_module
+from miniagent.config import AgentConfig, set_config, load_config
 from miniagent.tools.registry import tools, ToolSpec
 from miniagent.memory.store import IntegratedMemorySystem
+from miniagent.memory.plan_cache import PlanCache, tools_signature
 from miniagent.guard.schema import validate_action, sanitize_output
 from miniagent.eval.harness import AgentEvaluator, EvalSuite, EvalTask
+from miniagent.guard.consent import ConsentManager
 
 @pytest.fixture
 def test_config():
@@ -74,6 +80,48 @@ def test_memory_system():
         assert "episodic" in context
         assert "working" in context
 
+def test_remember_many():
+    """Test that queued memory writes are stored together on flush"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory_system = IntegratedMemorySystem(temp_dir)
+        state = AgentState(goal="test goal", memory_system=memory_system)
+        assert state.memory_system is memory_system
+        
+        state.queue_remember("Step 0: tool action", "episodic", {"step": 0})
+        state.queue_remember("Tool math.calc result: 4", "semantic", {"step": 0})
+        state.queue_remember("Reasoning at step 1: done", "semantic", {"step": 1})
+        assert state.memory_system.episodic.episodes == []
+        
+        # Reads see queued writes
+        memories = state.recall("math.calc result", "semantic")
+        assert any("math.calc" in m["content"] for m in memories)
+        assert len(state.memory_system.episodic.episodes) == 1
+        
+        ids = state.memory_system.remember_many([
+            ("first", "semantic", None),
+            ("second", "episodic", None),
+            ("third", "working", {"key": "k"}),
+        ])
+        assert ids[0] is not None and ids[1] is None and ids[2] == "k"
+
+@pytest.mark.asyncio
+async def test_vector_store_submit():
+    """Test that concurrent submissions are added in one batch"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = IntegratedMemorySystem(temp_dir).vector_store
+        batches = []
+        add_many = store.add_many
+
+        def recording_add_many(contents, metadatas=None):
+            batches.append(list(contents))
+            return add_many(contents, metadatas)
+
+        store.add_many = recording_add_many
+        ids = await asyncio.gather(*(store.submit(f"note {i}") for i in range(3)))
+
+        assert batches == [["note 0", "note 1", "note 2"]]
+        assert store.get(ids[1])["content"] == "note 1"
+
 def test_tools_registry():
     """Test tools registry functionality"""
     tool_list = tools.list()
@@ -113,6 +161,24 @@ def test_action_validation():
     with pytest.raises(ValueError):
         validate_action(invalid_action)
 
+def test_action_validation_rechecks_files():
+    """Test that cached validation still re-checks file paths and wide ints"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        target = os.path.join(temp_dir, "f")
+        Path(target).write_text("hi")
+        action = {"type": "tool", "name": "file.read", "args": {"path": target}}
+        assert validate_action(action)["name"] == "file.read"
+
+        # Swapping the file for a symlink into a blocked directory is caught
+        os.remove(target)
+        os.symlink("/etc/hostname", target)
+        with pytest.raises(ValueError):
+            validate_action(action)
+
+    wide = {"type": "tool", "name": "math.calc", "args": {"x": 2 ** 70 + 1}}
+    assert validate_action(wide)["args"]["x"] == 2 ** 70 + 1
+    assert validate_action(wide)["args"]["x"] == 2 ** 70 + 1
+
 def test_output_sanitization():
     """Test output sanitization"""
     # Test with normal content
@@ -126,6 +192,115 @@ def test_output_sanitization():
     # Should be masked
     assert "sk-1234567890abcdef" not in sanitized
 
+def test_consent_safe_directories():
+    """Test safe directory resolution in the consent manager"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = ConsentManager(interactive=False)
+        manager.safe_directories = [temp_dir, temp_dir + "/"]
+        
+        # Trailing-slash duplicates collapse to one resolved entry
+        assert manager.safe_directories == frozenset({os.path.realpath(temp_dir)})
+        
+        # Nested paths are safe, sibling paths sharing a name prefix are not
+        assert manager.is_safe_directory(os.path.join(temp_dir, "sub", "file.txt"))
+        assert not manager.is_safe_directory(temp_dir + "_other/file.txt")
+        
+        # The same holds for the working directory
+        manager.safe_directories = []
+        cwd = os.getcwd()
+        try:
+            os.chdir(temp_dir)
+            assert manager.is_safe_directory("file.txt")
+            assert not manager.is_safe_directory(temp_dir + "_other/file.txt")
+        finally:
+            os.chdir(cwd)
+        
+        # A symlink re-pointed out of the safe directory is no longer safe
+        manager.safe_directories = [os.path.join(temp_dir, "safe")]
+        os.mkdir(os.path.join(temp_dir, "safe"))
+        link = os.path.join(temp_dir, "safe", "link")
+        os.symlink(os.path.join(temp_dir, "safe"), link)
+        assert manager.is_safe_directory(link)
+        os.remove(link)
+        os.symlink("/etc", link)
+        assert not manager.is_safe_directory(link)
+
+@pytest.mark.asyncio
+async def test_consent_prompt_off_loop(monkeypatch):
+    """Test that consent prompts run one at a time without blocking the event loop"""
+    import builtins
+    import time
+    from miniagent.guard.consent import ConsentRequest, ConsentDecision
+    
+    prompts = []
+    
+    def slow_input(prompt=""):
+        prompts.append(prompt)
+        time.sleep(0.2)
+        return "s"  # allow this operation for the session
+    
+    monkeypatch.setattr(builtins, "input", slow_input)
+    manager = ConsentManager(interactive=True)
+    ticks = 0
+    
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+    
+    ticking = asyncio.ensure_future(ticker())
+    decisions = await asyncio.gather(*(
+        manager.request_consent(ConsentRequest("file.delete", "/tmp/a.txt", {}))
+        for _ in range(2)
+    ))
+    ticking.cancel()
+    
+    assert decisions == [ConsentDecision.ALLOW_SESSION, ConsentDecision.ALLOW]
+    assert len(prompts) == 1
+    assert ticks > 5
+
+@pytest.mark.asyncio
+async def test_consent_manager_per_task():
+    """Test that concurrent agents each see the consent manager they set"""
+    from miniagent.guard.consent import get_consent_manager, set_consent_manager
+
+    async def agent():
+        manager = ConsentManager(interactive=False)
+        set_consent_manager(manager)
+        await asyncio.sleep(0.01)
+        return get_consent_manager() is manager
+
+    assert await asyncio.gather(agent(), agent()) == [True, True]
+
+@pytest.mark.asyncio
+async def test_sandbox_per_run(monkeypatch):
+    """Test that concurrent agent runs each execute tools in their own sandbox"""
+    from miniagent.core import runtime
+    from miniagent.exec.sandbox import _get_sandbox
+
+    seen = []
+
+    async def record_sandbox(args):
+        seen.append(_get_sandbox())
+        await asyncio.sleep(0.01)
+        return {"result": "ok"}
+
+    def plan(state, tool_list):
+        if any("observation" in entry for entry in state.history):
+            return {"type": "finish", "output": "done"}
+        return {"type": "tool", "name": "test.sandbox", "args": {}}
+
+    tools.register(ToolSpec(name="test.sandbox", schema={"type": "object"}, fn=record_sandbox))
+    monkeypatch.setattr(runtime, "plan_next", plan)
+
+    await asyncio.gather(
+        run_agent("record the sandbox, first run", max_steps=2, quiet_mode=True, interactive_consent=False),
+        run_agent("record the sandbox, second run", max_steps=2, quiet_mode=True, interactive_consent=False),
+    )
+    assert len(seen) == 2
+    assert seen[0] is not seen[1]
+
 def test_evaluation_framework():
     """Test evaluation framework"""
     async def dummy_agent(goal, max_steps):
@@ -155,6 +330,36 @@ def test_evaluation_framework():
     assert results["successful_tasks"] == 1
     assert results["success_rate"] == 1.0
 
+def test_evaluation_concurrency():
+    """Test that concurrent suite runs overlap tasks and keep suite order"""
+    running = 0
+    peak = 0
+    
+    async def slow_agent(goal, max_steps):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05 if goal == "first" else 0.01)
+        running -= 1
+        return {"result": goal}
+    
+    suite = EvalSuite("concurrent_suite", "Concurrent evaluation suite")
+    for goal in ["first", "second", "third"]:
+        suite.add_task(EvalTask(id=goal, description=goal, goal=goal))
+    
+    evaluator = AgentEvaluator(output_dir=tempfile.mkdtemp())
+    results = asyncio.run(evaluator.run_suite(suite, slow_agent, concurrency=2))
+    
+    assert peak == 2
+    assert [r["task_id"] for r in results["results"]] == ["first", "second", "third"]
+    assert results["successful_tasks"] == 3
+    
+    # Without an explicit bound the evaluator's own concurrency applies
+    peak = 0
+    evaluator = AgentEvaluator(output_dir=tempfile.mkdtemp(), concurrency=3)
+    asyncio.run(evaluator.run_suite(suite, slow_agent))
+    assert peak == 3
+
 @pytest.mark.asyncio
 async def test_math_calculation():
     """Test mathematical calculation capability"""
@@ -202,6 +407,253 @@ def test_configuration():
         # Cleanup
         os.unlink(f.name)
 
+def test_config_cache(monkeypatch):
+    """Test that load_config reuses its snapshot until the file changes"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setattr(config_module, "CONFIG_CACHE_PATH", Path(temp_dir) / "config.cache.pkl")
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-from-env")
+        config_path = os.path.join(temp_dir, "agent.json")
+        
+        config = AgentConfig()
+        config.runtime.max_steps = 7
+        config.to_file(config_path)
+        
+        assert load_config(config_path).runtime.max_steps == 7
+        assert config_module.CONFIG_CACHE_PATH.exists()
+        # Keys resolved from the environment are not written to the cache
+        assert b"sk-from-env" not in config_module.CONFIG_CACHE_PATH.read_bytes()
+        
+        cached = load_config(config_path)
+        assert cached.runtime.max_steps == 7
+        assert cached.llm.openai.api_key == "sk-from-env"
+        
+        # Rewriting the file invalidates the snapshot
+        config.runtime.max_steps = 12
+        config.to_file(config_path)
+        os.utime(config_path, ns=(0, 0))
+        assert load_config(config_path).runtime.max_steps == 12
+
+def test_tools_cache(monkeypatch, capsys):
+    """Test that `tools --json` output is cached and reused until the key changes"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = os.path.join(temp_dir, "tools.cache.json")
+        monkeypatch.setattr(cli, "TOOLS_CACHE_PATH", cache_path)
+        args = argparse.Namespace(json=True)
+        
+        assert cli.cmd_tools(args) == 0
+        listing = capsys.readouterr().out
+        assert "file.read" in [tool["name"] for tool in json.loads(listing)]
+        with open(cache_path) as f:
+            assert f.readline().strip() == cli._tools_cache_key()
+        
+        assert cli.cmd_tools(args) == 0
+        assert capsys.readouterr().out == listing
+        
+        # A stale key forces a rebuild
+        monkeypatch.setattr(cli, "_tools_cache_key", lambda: "stale")
+        assert cli.cmd_tools(args) == 0
+        assert capsys.readouterr().out == listing
+        with open(cache_path) as f:
+            assert f.readline().strip() == "stale"
+
+def test_legacy_cli_args():
+    """Test that `miniagent "goal" --steps=N` maps onto the run command's arguments"""
+    args = cli._legacy_run_args(["Summarize the README", "--steps=3"])
+    assert args.goal == "Summarize the README"
+    assert args.steps == 3
+    assert not args.json and not args.quiet
+    
+    assert cli._legacy_run_args(["Another goal"]).steps == 6
+
+def test_plan_cache():
+    """Test that finished plans are replayed for similar goals with rebound arguments"""
+    def encode(text):
+        # Bag-of-words stand-in for the sentence encoder
+        vocabulary = ["read", "file", "summarize", "weather", "count", "lines"]
+        return [float(word in text.lower()) for word in vocabulary]
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_path = Path(temp_dir) / "plan_cache.json"
+        tools_hash = tools_signature(["file.read", "web.search"])
+        cache = PlanCache(cache_path, encode)
+        cache.store("Read file notes.txt and summarize it", tools_hash, [
+            {"type": "tool", "name": "file.read", "args": {"path": "notes.txt"}},
+        ])
+        
+        # A fresh instance reads the persisted entry
+        cache = PlanCache(cache_path, encode)
+        actions = cache.lookup("Read file todo.md and summarize it", tools_hash)
+        assert actions == [{"type": "tool", "name": "file.read", "args": {"path": "todo.md"}}]
+        
+        # Different tool set or dissimilar goal: no replay
+        assert cache.lookup("Read file todo.md and summarize it", tools_signature(["file.read"])) is None
+        assert cache.lookup("What is the weather?", tools_hash) is None
+    
+    # A numeric slot does not rewrite the digit of an earlier placeholder
+    from miniagent.memory.plan_cache import _template_args, _rebind_args
+    template = _template_args({"path": "report.txt"}, 'Read "report.txt" and show line 0')
+    assert _rebind_args(template, 'Read "notes.md" and show line 3') == {"path": "notes.md"}
+    
+    # Numbers in free text are left alone, file names are still rebound
+    template = _template_args({"path": "out.txt", "content": "Total: 3 items, cost $3"},
+                              "Write the 3 totals to out.txt")
+    assert _rebind_args(template, "Write the 5 totals to new.txt") == {
+        "path": "new.txt", "content": "Total: 3 items, cost $3"}
+
+def test_tool_cache_key():
+    """Test that tool call cache keys ignore argument order but not values"""
+    from miniagent.core.runtime import _tool_cache_key
+    
+    key = _tool_cache_key("file.read", {"path": "a.txt", "encoding": "utf-8"})
+    assert key == _tool_cache_key("file.read", {"encoding": "utf-8", "path": "a.txt"})
+    assert key != _tool_cache_key("file.read", {"path": "b.txt", "encoding": "utf-8"})
+    assert key != _tool_cache_key("file.list", {"path": "a.txt", "encoding": "utf-8"})
+
+@pytest.mark.asyncio
+async def test_tool_batch():
+    """Test that a tool_batch action runs its calls concurrently, in call order"""
+    from miniagent.core.runtime import _RunContext, _Console, _handle_tool_batch
+    from miniagent.guard.consent import set_consent_manager
+    
+    calls = []
+    
+    async def slow_echo(args):
+        calls.append(args["text"])
+        await asyncio.sleep(0.2)
+        return {"result": args["text"]}
+    
+    tools.register(ToolSpec(name="test.echo", schema={"type": "object"}, fn=slow_echo))
+    action = validate_action({"type": "tool_batch", "calls": [
+        {"name": "test.echo", "args": {"text": "first"}},
+        {"name": "test.echo", "args": {"text": "second"}},
+        {"name": "test.missing"},
+    ]})
+    
+    config = AgentConfig()
+    config.runtime.cacheable_tools = ["test.echo"]
+    state = AgentState(goal="test goal")
+    ctx = _RunContext(goal="test goal", config=config, ui=_Console(), quiet_mode=True,
+                      show_thinking=False, interactive_consent=False, consent_required={},
+                      tool_specs={spec.name: spec for spec in tools.list()}, replay=[])
+    
+    start = asyncio.get_running_loop().time()
+    assert await _handle_tool_batch(state, action, 0, ctx) is None
+    elapsed = asyncio.get_running_loop().time() - start
+    
+    results = state.history[-1]["observations"]
+    assert results[:2] == [{"result": "first"}, {"result": "second"}]
+    assert "error" in results[2]
+    assert elapsed < 0.35
+    
+    # Repeated calls are served from the run's tool cache
+    await _handle_tool_batch(state, action, 1, ctx)
+    assert calls == ["first", "second"]
+    
+    # A read batched with a write to the same file is not cached
+    from miniagent.core.runtime import _handle_tool
+    config.runtime.cacheable_tools = ["test.echo", "file.read"]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        target = os.path.join(temp_dir, "f.txt")
+        Path(target).write_text("old\n")
+        read = {"name": "file.read", "args": {"path": target}}
+        write = {"name": "file.write", "args": {"path": target, "content": "new\n"}}
+        await _handle_tool_batch(state, validate_action({"type": "tool_batch", "calls": [read, write]}), 2, ctx)
+        await _handle_tool(state, validate_action({"type": "tool", **read}), 3, ctx)
+        assert state.history[-1]["observation"]["content"] == "new\n"
+        assert state.history[-1]["cached"] is False
+    
+    # Denials are recorded, and a repeated denial ends the run
+    set_consent_manager(ConsentManager(interactive=False, auto_approve_safe=False))
+    ctx.consent_required = {"test.echo": True}
+    denied = validate_action({"type": "tool_batch", "calls": [
+        {"name": "test.echo", "args": {"text": "third"}},
+        {"name": "math.calc", "args": {"expression": "1 + 1"}},
+    ]})
+    outcome = await _handle_tool_batch(state, denied, 4, ctx)
+    assert any(entry.get("consent_denied") for entry in state.history)
+    assert outcome is None
+    assert state.history[-1]["observations"][0]["error"] == "Operation 'test.echo' denied by user"
+    outcome = await _handle_tool_batch(state, denied, 5, ctx)
+    assert outcome is not None and "denied permission" in outcome["result"]
+    assert calls == ["first", "second"]
+    
+    with pytest.raises(ValueError):
+        validate_action({"type": "tool_batch", "calls": []})
+
+@pytest.mark.asyncio
+async def test_sandbox_subprocess():
+    """Test that risky tools run in a worker process that is killed on timeout"""
+    from miniagent.exec.sandbox import SandboxExecutor, SecurityError
+    from miniagent.tools import builtin
+
+    sandbox = SandboxExecutor()
+    shell = ToolSpec(name="shell.exec", schema={}, fn=builtin._execute_shell, timeout_s=5)
+    result = await sandbox.execute_with_limits(shell, {"command": "echo $PPID"})
+    assert int(result["stdout"]) != os.getpid()
+
+    shell.timeout_s = 0.5
+    start = asyncio.get_running_loop().time()
+    with pytest.raises(SecurityError):
+        await sandbox.execute_with_limits(shell, {"command": "sleep 5"})
+    assert asyncio.get_running_loop().time() - start < 2
+
+def test_consent_needed_table():
+    """Test that consent requirements follow the current consent settings"""
+    from miniagent.core.runtime import _check_if_consent_needed
+    
+    config = AgentConfig()
+    assert _check_if_consent_needed("file.write", {}, config, True)
+    assert not _check_if_consent_needed("file.read", {}, config, True)
+    assert not _check_if_consent_needed("math.calc", {}, config, True)
+    assert not _check_if_consent_needed("file.write", {}, config, False)
+    
+    # Settings changed in place take effect on the next check
+    config.consent.require_consent_for_write = False
+    config.consent.auto_approve_read_operations = False
+    assert not _check_if_consent_needed("file.write", {}, config, True)
+    assert _check_if_consent_needed("file.read", {}, config, True)
+
+def test_truncated_str():
+    """Test that bounded previews match str(value)[:limit]"""
+    from miniagent._text import truncated_str, preview
+    
+    values = [
+        {"content": "x" * 100000, "path": "a.txt"},
+        {"path": "a", "items": [1, "two", None, {"k": 3.5}]},
+        ["line"] * 1000,
+        "plain text" * 100,
+        42,
+    ]
+    for value in values:
+        for limit in (1, 20, 200, 500):
+            assert truncated_str(value, limit) == str(value)[:limit]
+    
+    assert preview("x" * 100, 100) == "x" * 100
+    assert preview({"content": "x" * 100000}, 20) == "{'content': 'xxxx..."
+
+def test_direct_answers():
+    """Test that plain arithmetic goals are answered without planning"""
+    from miniagent.core.runtime import _direct_answer
+    
+    assert _direct_answer("Calculate 3 * 4") == "3 * 4 = 12"
+    assert _direct_answer("what is (2 + 5) / 7?") == "(2 + 5) / 7 = 1"
+    assert _direct_answer("Compute 0.1 + 0.2") == "0.1 + 0.2 = 0.3"
+    
+    # Anything else goes to the planner
+    assert _direct_answer("Calculate the area of a circle with radius 5") is None
+    assert _direct_answer("Calculate 1 / 0") is None
+    assert _direct_answer("Calculate 9 ** 9 ** 9") is None
+    assert _direct_answer("Calculate 42") is None
+
+def test_action_handlers():
+    """Test that every action type accepted by validation has a runtime handler"""
+    from typing import get_args
+    from miniagent.core.runtime import _ACTION_HANDLERS
+    from miniagent.guard.schema import Action
+
+    action_types = get_args(Action.model_fields["type"].annotation)
+    assert set(_ACTION_HANDLERS) == set(action_types)
+
 def test_custom_tool_registration():
     """Test custom tool registration"""
     def custom_test_tool(args):